@@ -2,9 +2,15 @@ import streamlit as st
 import json
 import os
 import time
-from google import genai
-from google.genai import types
 from google.genai.errors import APIError
+from llm_calls import hedge_metrics, HEDGING_ENABLED
+from shared_resources import get_client, use_stylesheet, bind_usage, start_usage_flow, complete_usage_flow
+from repurposer_pipeline import api_call_fused
+from json_stream import JsonObjectStream
+from platform_rules import polish_results, summarize as summarize_polish
+from rerun_profiler import profile_rerun
+
+profile_rerun("repurposer_classic")
 
 # --- Configuration ---
 GEMINI_MODEL = 'gemini-2.5-flash-preview-09-2025'
@@ -22,149 +28,36 @@ try:
         st.info("Please set the GEMINI_API_KEY in your Streamlit secrets.")
         client = None
     else:
-        client = genai.Client(api_key=API_KEY)
+        client = get_client(API_KEY)
 except Exception as e:
     st.error(f"Error initializing Gemini client: {e}")
     client = None
 
+bind_usage("repurposer_classic")
+
 # --- Custom CSS for RizenAi Styling ---
-st.markdown(
-    """
-    <style>
-    /* 1. Import Poppins Font */
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap');
-
-    /* 2. Global Font and Background */
-    html, body, [class*="css"] {
-        font-family: 'Poppins', sans-serif;
-    }
-    .stApp {
-        background-color: #00243B; /* Dark midnight blue */
-    }
-
-    /* 3. Gradient Border around the Main Block */
-    /* We target the main block container to give it the frame */
-    .block-container {
-        border: 2px solid transparent;
-        background-clip: padding-box, border-box;
-        background-origin: padding-box, border-box;
-        background-image: linear-gradient(#00243B, #00243B), 
-                          linear-gradient(to right, #00FFFF, #FF00FF, #FFD700, #00FFFF); /* Neon Gradient */
-        border-radius: 15px;
-        padding: 3rem 2rem !important; /* Internal spacing */
-        margin-top: 2rem;
-        box-shadow: 0 0 20px rgba(0, 255, 255, 0.1);
-    }
-
-    /* 4. Input Fields Styling */
-    .stTextInput input, .stTextArea textarea, .stSelectbox div[data-baseweb="select"] {
-        background-color: rgba(0, 0, 0, 0.3) !important;
-        border: 1px solid #00FFFF !important;
-        color: white !important;
-        border-radius: 8px;
-    }
-    /* Focus state for inputs */
-    .stTextInput input:focus, .stTextArea textarea:focus {
-        border-color: #00BFFF !important;
-        box-shadow: 0 0 10px rgba(0, 191, 255, 0.5);
-    }
-    /* Labels */
-    .stMarkdown label, .stTextInput label, .stTextArea label, .stSelectbox label {
-        color: #00FFFF !important;
-    }
-
-    /* 5. Custom Button Styling (Larger, Aqua Gradient, Glow) */
-    .stButton > button {
-        width: 100%;
-        background: linear-gradient(145deg, #00BFFF, #00FFFF); /* Neon Aqua Gradient */
-        color: #00243B !important;
-        font-weight: 700 !important;
-        font-size: 1.4rem !important; /* Bigger Font */
-        padding: 1.25rem !important;      /* Broader/Taller Button */
-        border: none;
-        border-radius: 0.5rem;
-        transition: all 0.3s ease;
-        margin-top: 1.5rem; /* Added spacing */
-    }
-    
-    .stButton > button:hover {
-        box-shadow: 0 0 20px #00FFFF; /* Slight Glow on Hover */
-        transform: scale(1.01);
-        color: #00243B !important;
-        border: 1px solid rgba(255, 255, 255, 0.5);
-    }
-
-    /* 6. Output Card Styling */
-    .output-card {
-        background-color: rgba(255, 255, 255, 0.05);
-        border: 1px solid #00BFFF;
-        border-radius: 10px;
-        padding: 20px;
-        margin-bottom: 20px;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+# Built, content-hashed stylesheet from styles/repurposer_classic.css (see build_static_assets.py)
+use_stylesheet("repurposer_classic")
 
 # --- Logic Functions ---
 
-def create_system_instruction(data):
-    """Generates the multi-phase system instruction for the Gemini model."""
-    platforms_str = ', '.join(data['platforms'])
-    
-    return f"""
-        You are the RizenAi Content Repurposing System Orchestrator. 
-        User Profile: Name: {data['name']}, Profession: {data['profession']}, Objective: {data['objective']}, Tone: {data['tone']}
-        Target Platforms: {platforms_str}
-        Extra Context: {data['extra_info']}
-        
-        PHASE 1 (Gemini): Analyze trends for {data['profession']}. Define Thematic Focus.
-        PHASE 2 (ChatGPT Persona): Draft production prompt based on focus.
-        PHASE 3 (Claude Persona): Write final human-like content. Avoid mechanical phrasing.
-        
-        Original Content:
-        {data['original_content']}
-        
-        OUTPUT FORMAT: Single valid JSON object. Keys = platform names (underscores). Values = content.
-        {{
-            "{data['platforms'][0].replace(' ', '_')}": "Content..."
-        }}
-    """
-
-def get_generation_config(platforms):
-    properties = {}
-    for platform in platforms:
-        properties[platform.replace(' ', '_')] = {"type": "string"}
-    
-    # FINAL FIX: Removed the 'tools' property which conflicted with 'response_mime_type="application/json"'.
-    return types.GenerateContentConfig(
-        response_mime_type="application/json",
-        response_schema={"type": "object", "properties": properties}
-        # Tools removed here to resolve the 400 INVALID_ARGUMENT error.
-    )
-
-def repurpose_content(data):
+# create_system_instruction / get_generation_config live in repurposer_pipeline.py,
+# shared with the fused mode of Cont_rep_Mk1_V3.py and the benchmark.
+
+def repurpose_content(data, on_card=None):
+    """Runs the fused call. With on_card, each platform is passed to on_card(key, content) as soon as its value is complete."""
     if not client:
         return None
     
-    system_instruction_text = create_system_instruction(data)
-    generation_config = get_generation_config(data['platforms'])
-    
-    # Combined query to handle system instructions in a compatible way
-    combined_query = f"{system_instruction_text}\n\nUSER QUERY: Repurpose the Original Content for the user, following the system instructions and JSON format."
-    
-    contents = [
-        combined_query
-    ]
-    
     try:
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=contents, 
-            config=generation_config
-        )
-        return json.loads(response.text)
+        # Combined query (system instruction + JSON schema) in a single call, streamed
+        # so every platform's card can show while the model is still writing the next
+        stream = JsonObjectStream()
+        def on_text(chunk):
+            for key, content in stream.feed(chunk):
+                on_card(key, content)
+        response_text = api_call_fused(client, data, model=GEMINI_MODEL, on_text=on_text if on_card else None)
+        return json.loads(response_text)
     except Exception as e:
         # Check if the error is due to bad JSON output from the model
         if 'JSONDecodeError' in str(e):
@@ -174,6 +67,15 @@ def repurpose_content(data):
         st.error(f"Generation Error: {e}")
         return None
 
+def render_card(placeholder, key, content):
+    platform_name = key.replace('_', ' ')
+    placeholder.markdown(f"""
+    <div class="output-card">
+        <h4 style="color: #00FFFF; margin-bottom: 10px;">{platform_name}</h4>
+        <div style="white-space: pre-wrap; color: #e5e7eb;">{content}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
 # --- UI Layout ---
 
 # Centered Headers
@@ -214,20 +116,41 @@ if submitted:
             "extra_info": extra_info
         }
         
+        # Cards are drawn as each platform's text completes, then redrawn in place once polished
+        header = st.empty()
+        note = st.empty()
+        cards = {}
+        def show_card(key, content):
+            if not cards:
+                header.markdown('<h3 style="color: #00BFFF; margin-top: 30px; text-align: center;">Meal Served! Your Deliverables</h3>', unsafe_allow_html=True)
+            if key not in cards:
+                cards[key] = st.empty()
+            render_card(cards[key], key, content)
+        
         with st.spinner("Processing..."):
-            results = repurpose_content(form_data)
+            start_usage_flow("repurposer_classic")
+            results = repurpose_content(form_data, on_card=show_card)
             
-            if results:
-                st.markdown('<h3 style="color: #00BFFF; margin-top: 30px; text-align: center;">Meal Served! Your Deliverables</h3>', unsafe_allow_html=True)
+            if not results:
+                header.empty()
+                for placeholder in cards.values():
+                    placeholder.empty()
+            else:
+                # Local platform-rule pass; only still-broken posts go back to the model
+                results, polish_report = polish_results(results, client)
+                complete_usage_flow("repurposer_classic")
+                polish_note = summarize_polish(polish_report)
+                if polish_note:
+                    note.caption(f"🧹 {polish_note}")
                 for key, content in results.items():
-                    platform_name = key.replace('_', ' ')
-                    st.markdown(f"""
-                    <div class="output-card">
-                        <h4 style="color: #00FFFF; margin-bottom: 10px;">{platform_name}</h4>
-                        <div style="white-space: pre-wrap; color: #e5e7eb;">{content}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    show_card(key, content)
                 
-                st.download_button("Download JSON", data=json.dumps(results, indent=2), file_name="rizenai_content.json", mime="application/json")
+                # Built on click only; "ignore" keeps the cards on screen after downloading
+                st.download_button("Download JSON", data=lambda: json.dumps(results, indent=2), file_name="rizenai_content.json", mime="application/json", on_click="ignore")
+
+# --- Call Metrics (only when hedging is switched on) ---
+if HEDGING_ENABLED:
+    with st.sidebar.expander("⏱️ Hedge Metrics"):
+        st.json(hedge_metrics())
 
 st.markdown('<p style="text-align: center; color: #6b7280; font-size: 0.8rem; margin-top: 3rem;">© RizenAi.Co | All Rights Reserved</p>', unsafe_allow_html=True)
@@ -1,101 +1,32 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
-import json
 import time 
-from google import genai
-from google.genai import types
+from llm_calls import hedge_metrics, HEDGING_ENABLED, SHOW_METRICS
+from llm_backends import FAILOVER_ENABLED, backend_status
+from shared_resources import (
+    get_client, load_lottiefile, use_stylesheet, bind_usage, start_usage_flow, complete_usage_flow,
+)
+from repurposer_pipeline import (
+    PIPELINE_MODES, MODE_STAGES, api_call_step1_captain, api_call_step2_sous_chef,
+    api_call_step3_chef, api_call_planner, api_call_fused, fused_to_markdown,
+)
+import checkpoints
+from platform_rules import polish_text, summarize as summarize_polish
+from stream_view import LiveMarkdown
+from exports import EXPORT_FORMATS, lazy_export, file_name
+from rerun_profiler import profile_rerun
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="RizenAi Content Repurposer", page_icon="🚀", layout="centered")
 
-# --- CUSTOM CSS ---
-st.markdown("""
-    <style>
-    /* Import Poppins Font */
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&display=swap');
-    
-    html, body, [class*="st-"] {
-        font-family: 'Poppins', sans-serif !important;
-    }
-
-    /* THEME COLORS */
-    h1, h2, h3, p {
-        color: white !important;
-    }
-    
-    /* GRADIENT BORDER CONTAINER */
-    div[data-testid="stForm"] {
-        background-color: #00243B;
-        border: 2px solid transparent;
-        border-image: linear-gradient(to right, #00FFFF, #FF007F) 1;
-        border-radius: 10px;
-        padding: 30px;
-        box-shadow: 0 0 15px rgba(0, 255, 255, 0.2);
-    }
-
-    /* INPUT FIELDS STYLING */
-    .stTextInput > div > div > input, .stTextArea > div > div > textarea {
-        background-color: #001829 !important; 
-        color: white !important;
-        border: 1px solid #00FFFF !important; 
-        border-radius: 5px;
-    }
-
-    /* MULTI-SELECT STYLING */
-    .stMultiSelect > div > div > div {
-        background-color: #001829 !important;
-        color: white !important;
-        border: 1px solid #00FFFF !important;
-    }
-    /* The selected tags inside the multiselect */
-    .stMultiSelect span[data-baseweb="tag"] {
-        background-color: #00FFFF !important;
-        color: black !important;
-    }
-    
-    /* --- BUTTON STYLING (BRUTE FORCE FIX) --- */
-    div[data-testid="stForm"] button {
-        background: linear-gradient(90deg, #00C6FF 0%, #0072FF 100%) !important;
-        color: white !important;
-        font-family: 'Poppins', sans-serif !important;
-        font-weight: 700 !important;
-        font-size: 20px !important;
-        border: none !important;
-        border-radius: 8px !important;
-        padding: 15px 0px !important;
-        
-        /* Full Width & Centered */
-        width: 100% !important;
-        display: block !important;
-        margin: 0 auto !important;
-        
-        box-shadow: 0 0 15px rgba(0, 198, 255, 0.4);
-        transition: all 0.3s ease-in-out;
-    }
-    div[data-testid="stForm"] button:hover {
-        box-shadow: 0 0 30px rgba(0, 255, 255, 0.9);
-        transform: scale(1.01);
-        color: white !important;
-    }
+profile_rerun("repurposer")
 
-    /* FOOTER STYLING */
-    .footer {
-        text-align: center;
-        color: #888888;
-        font-size: 12px;
-        margin-top: 50px;
-    }
-    </style>
-""", unsafe_allow_html=True)
+# --- CUSTOM CSS ---
+# Built, content-hashed stylesheet from styles/repurposer.css (see build_static_assets.py)
+use_stylesheet("repurposer")
 
 # --- ASSET LOADING ---
-@st.cache_data
-def load_lottiefile(filepath: str):
-    try:
-        with open(filepath, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
+# load_lottiefile comes from shared_resources, so all pages share one asset cache
 
 LOTTIE_ORDER = "OrderPlaced.json" 
 LOTTIE_COOKING = "PrepareFood.json"
@@ -103,60 +34,16 @@ LOTTIE_SERVE = "FoodServed.json"
 
 # --- API SETUP ---
 try:
-    client = genai.Client(api_key=st.secrets["GEMINI_API_KEY"])
+    client = get_client(st.secrets["GEMINI_API_KEY"])
     api_ready = True
 except Exception:
     st.error("⚠️ System Error: GEMINI_API_KEY is missing in Streamlit Secrets.")
     api_ready = False
 
-# --- LOGIC FUNCTIONS (Gemini Free Tier) ---
-
-def api_call_step1_captain(raw_content, user_profile, selected_platforms):
-    """Step 1: Analyze strategy based on SELECTED platforms."""
-    SYSTEM_INSTRUCTION = "You are the 'Captain'. Analyze the user profile, content, and TARGET PLATFORMS. Structure a strategic 'Order Block'."
-    
-    # We explicitly tell the AI which platforms to focus on
-    prompt = f"""
-    User Profile: {user_profile}
-    TARGET PLATFORMS: {selected_platforms}
-    Content: {raw_content[:500]}...
-    
-    Create a strategic Order Block specifically for these platforms.
-    """
-    
-    response = client.models.generate_content(
-        model='gemini-2.5-flash', contents=prompt,
-        config=types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION, temperature=0.3)
-    )
-    return response.text
-
-def api_call_step2_sous_chef(order_block, raw_content, selected_platforms):
-    """Step 2: Draft blueprints ONLY for the selected platforms."""
-    SYSTEM_INSTRUCTION = "You are the 'Sous Chef' (GPT-4 Mimic). Create detailed Production Instructions."
-    
-    prompt = f"""
-    Order Block: {order_block}
-    Original Content: {raw_content}
-    TARGET PLATFORMS: {selected_platforms}
-    
-    Create detailed writing instructions for EACH of the selected target platforms.
-    """
-    
-    response = client.models.generate_content(
-        model='gemini-2.5-flash', contents=prompt,
-        config=types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION, temperature=0.5)
-    )
-    return response.text
+bind_usage("repurposer")
 
-def api_call_step3_chef(production_prompt):
-    """Step 3: Execute the blueprints."""
-    SYSTEM_INSTRUCTION = "You are the 'Chef' (Claude Mimic). Write human-like, nuanced content deliverables based on the instructions."
-    
-    response = client.models.generate_content(
-        model='gemini-2.5-flash', contents=production_prompt,
-        config=types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION, temperature=0.8)
-    )
-    return response.text
+# --- LOGIC FUNCTIONS (Gemini Free Tier) ---
+# The stage calls live in repurposer_pipeline.py so the offline benchmark runs the exact same prompts.
 
 # --- MAIN UI LAYOUT ---
 
@@ -206,12 +93,96 @@ with st.form("blueprint_form"):
     st.markdown("**Any Extra Vital Information (e.g., specific keywords, call to action)**")
     extra_info = st.text_input("Extra Info", placeholder="Optional: e.g., Primary CTA is 'Visit rizenai.co'...", label_visibility="collapsed")
 
+    # Row 6: Pipeline Mode (fewer calls = faster; see bench_pipeline_modes.py)
+    st.markdown("**Kitchen Mode**")
+    pipeline_mode = st.selectbox("Kitchen Mode", list(PIPELINE_MODES), format_func=PIPELINE_MODES.get, label_visibility="collapsed")
+    show_kitchen = st.checkbox("👀 Watch the kitchen live (show the Captain & Sous Chef drafts as they are written)")
+
     st.write("") 
     
     # Submit Button
     submitted = st.form_submit_button("🚀 Plug & Play: Repurpose Content Now")
 
 # --- 3. EXECUTION LOGIC ---
+
+def request_retry():
+    st.session_state.retry_requested = True
+
+def start_over():
+    checkpoints.clear(st.session_state.pending_run["key"])
+    st.session_state.pending_run = None
+
+def show_step(progress_container, title, lottie_file, key, note, note_fn, live_label=None, inline=False):
+    """Draws a step's progress view. Returns a LiveMarkdown to stream the step's output into, if asked for."""
+    progress_container.empty()
+    with progress_container.container():
+        st.subheader(title)
+        st_lottie(load_lottiefile(lottie_file), height=120 if inline else 200, key=key, loop=True)
+        note_fn(note)
+        if inline:
+            return LiveMarkdown()
+        if live_label:
+            return LiveMarkdown(st.expander(live_label))
+    return None
+
+def run_pipeline(run):
+    """Runs the selected mode's calls, skipping any stage already checkpointed for this submission."""
+    mode = run["mode"]
+    done = checkpoints.load(run["key"])
+    progress_container = st.empty()
+    
+    if mode == "fused":
+        show_step(progress_container, "One-Pot Express: Cooking Everything at Once 🍲", LOTTIE_COOKING, "fused",
+                  f"Gemini is writing for: {run['platforms_str']}...", st.info)
+        data = dict(run["profile"], platforms=run["platforms"], original_content=run["raw_content"])
+        final_output = fused_to_markdown(api_call_fused(client, data), run["platforms"])
+        progress_container.empty()
+        return final_output
+    
+    # STEP 1: ORDER (Gemini)
+    if mode == "three_stage" and "order_block" not in done:
+        view = show_step(progress_container, "Step 1: The Chef Takes the Order 📝", LOTTIE_ORDER, "order",
+                         f"Gemini is analyzing strategy for: {run['platforms_str']}...", st.info,
+                         live_label="👀 Captain's Order Block (live)" if run["show_kitchen"] else None)
+        done["order_block"] = api_call_step1_captain(client, run["raw_content"], run["user_profile"], run["platforms_str"], on_text=view)
+        if view:
+            view.finish(done["order_block"])
+        checkpoints.save(run["key"], "order_block", done["order_block"])
+    
+    # STEP 2: PREP (ChatGPT Mimic) - two-stage mode plans and preps in one call
+    if "production_prompt" not in done:
+        if mode == "three_stage":
+            view = show_step(progress_container, "Step 2: Tossed in the Wok! 🔥", LOTTIE_COOKING, "prep",
+                             "Drafting the production blueprint...", st.warning,
+                             live_label="👀 Sous Chef's Blueprint (live)" if run["show_kitchen"] else None)
+            done["production_prompt"] = api_call_step2_sous_chef(client, done["order_block"], run["raw_content"], run["platforms_str"], on_text=view)
+        else:
+            view = show_step(progress_container, "Step 1: Order Taken & Prepped 📝🔥", LOTTIE_ORDER, "order",
+                             f"Planning and drafting the blueprint for: {run['platforms_str']}...", st.info,
+                             live_label="👀 Captain & Sous Chef's Blueprint (live)" if run["show_kitchen"] else None)
+            done["production_prompt"] = api_call_planner(client, run["raw_content"], run["user_profile"], run["platforms_str"], on_text=view)
+        if view:
+            view.finish(done["production_prompt"])
+        checkpoints.save(run["key"], "production_prompt", done["production_prompt"])
+    
+    # STEP 3: SERVE (Claude Mimic) - streamed onto the page as it is plated
+    view = show_step(progress_container, f"Step {len(MODE_STAGES[mode]) + 1}: Final Plating... 🍽️", LOTTIE_SERVE, "serve",
+                     "Cooking final deliverables...", st.success, inline=True)
+    final_output = api_call_step3_chef(client, done["production_prompt"], on_text=view)
+    progress_container.empty()
+    return final_output
+
+def polish_output(final_output):
+    """Local platform-rule pass; only still-broken sections go back to the model."""
+    with st.spinner("Checking platform rules..."):
+        final_output, report = polish_text(final_output, client)
+    return final_output, summarize_polish(report)
+
+if 'pending_run' not in st.session_state:
+    st.session_state.pending_run = None
+
+run_requested = st.session_state.pop('retry_requested', False) and st.session_state.pending_run is not None
+
 if submitted:
     if not raw_content or not name or not profession:
         st.error("⚠️ Please fill in all mandatory fields (Name, Profession, Content).")
@@ -225,43 +196,56 @@ if submitted:
         
         user_profile = f"Name: {name}, Profession: {profession}, Objective: {objective}, Tone: {tone}, Extra: {extra_info}"
         
-        progress_container = st.empty()
-        
-        # STEP 1: ORDER (Gemini)
-        with progress_container.container():
-            st.subheader("Step 1: The Chef Takes the Order 📝")
-            st_lottie(load_lottiefile(LOTTIE_ORDER), height=200, key="order", loop=True)
-            st.info(f"Gemini is analyzing strategy for: {platforms_str}...")
-        
-        # Pass platforms to Step 1
-        order_block = api_call_step1_captain(raw_content, user_profile, platforms_str)
-        
-        # STEP 2: PREP (ChatGPT Mimic)
-        progress_container.empty()
-        with progress_container.container():
-            st.subheader("Step 2: Tossed in the Wok! 🔥")
-            st_lottie(load_lottiefile(LOTTIE_COOKING), height=200, key="prep", loop=True)
-            st.warning("Drafting the production blueprint...")
-        
-        # Pass platforms to Step 2
-        production_prompt = api_call_step2_sous_chef(order_block, raw_content, platforms_str)
-        
-        # STEP 3: SERVE (Claude Mimic)
-        progress_container.empty()
-        with progress_container.container():
-            st.subheader("Step 3: Final Plating... 🍽️")
-            st_lottie(load_lottiefile(LOTTIE_SERVE), height=200, key="serve", loop=True)
-            st.success("Cooking final deliverables...")
-        
-        final_output = api_call_step3_chef(production_prompt)
+        # Same submission -> same key, so resubmitting after a failure also resumes.
+        st.session_state.pending_run = {
+            "key": checkpoints.submission_key(raw_content, user_profile, platforms_str, pipeline_mode),
+            "mode": pipeline_mode, "raw_content": raw_content, "user_profile": user_profile,
+            "platforms": platforms, "platforms_str": platforms_str, "show_kitchen": show_kitchen,
+            "profile": {"name": name, "profession": profession, "objective": objective, "tone": tone, "extra_info": extra_info},
+        }
+        start_usage_flow("repurposer")
+        run_requested = True
+
+if run_requested:
+    run = st.session_state.pending_run
+    try:
+        final_output = run_pipeline(run)
+        final_output, polish_note = polish_output(final_output)
+    except Exception as e:
+        done = checkpoints.load(run["key"])
+        stages = MODE_STAGES[run["mode"]]
+        next_step = next((n for n, stage in enumerate(stages, 1) if stage not in done), len(stages) + 1)
+        st.error(f"⚠️ Step {next_step} failed: {e}")
+        if next_step > 1:
+            st.info(f"Everything before Step {next_step} is saved. Retrying picks up from there.")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button(f"🔁 Retry from Step {next_step}", on_click=request_retry, use_container_width=True)
+        with col2:
+            st.button("↩️ Start Over", on_click=start_over, use_container_width=True)
+    else:
+        checkpoints.clear(run["key"])
+        st.session_state.pending_run = None
+        complete_usage_flow("repurposer")
         
         # FINAL DISPLAY
-        progress_container.empty()
         st.balloons()
         st.markdown("<h2 style='text-align: center; color: #00FFFF;'>🎉 Content Ready!</h2>", unsafe_allow_html=True)
         st.markdown("---")
+        if polish_note:
+            st.caption(f"🧹 {polish_note}")
         st.markdown(final_output)
-        st.download_button("📥 Download Content", data=final_output, file_name="rizenai_content.md", use_container_width=True)
+        # Downloads are built on click only; "ignore" keeps the page (and this output) as it is
+        for col, fmt in zip(st.columns(3), ["md", "docx", "txt"]):
+            with col:
+                st.download_button(f"📥 {EXPORT_FORMATS[fmt]['label']}", data=lazy_export(final_output, fmt, "RizenAi Content"),
+                                   file_name=file_name("rizenai_content", fmt), mime=EXPORT_FORMATS[fmt]["mime"],
+                                   on_click="ignore", use_container_width=True)
+
+# --- CALL METRICS (hedging / failover) ---
+if HEDGING_ENABLED or SHOW_METRICS or FAILOVER_ENABLED:
+    with st.sidebar.expander("⏱️ Call Metrics"):
+        st.json({"hedging": hedge_metrics(), "backends": backend_status()})
 
 # --- FOOTER ---
 st.markdown("<div class='footer'>© RizenAi.Co | All Rights Reserved</div>", unsafe_allow_html=True)
@@ -1,118 +1,38 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
-import json
 import time
-from google import genai
-from google.genai import types
+from llm_calls import hedge_metrics, HEDGING_ENABLED, SHOW_METRICS
+from llm_backends import FAILOVER_ENABLED, backend_status
+from shared_resources import (
+    get_client, load_lottiefile, use_stylesheet, bind_usage, start_usage_flow, complete_usage_flow,
+)
+from singleflight import SingleFlight, request_key
+import checkpoints
+from seven_day_pipeline import (
+    build_topic_prompt, topic_input_context, fetch_topic_options, plan_checkpoint_key, generate_7_day_plan,
+)
+from platform_rules import polish_text, summarize as summarize_polish
+from topic_index import TopicIndex, INDEX_PATH
+import semantic_cache
+import datetime
+from exports import EXPORT_FORMATS, lazy_export, file_name
+from content_store import ContentStore, compact_plan
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from rerun_profiler import profile_rerun
+from usage_ledger import BudgetExceeded
+import os
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="RizenAi 7-Day Content System", page_icon="📅", layout="centered")
 
+profile_rerun("seven_day", st.session_state.get("stage", "SCREEN_1"))
+
 # --- CUSTOM CSS (Midnight Blue Theme & Styling) ---
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&display=swap');
-    
-    html, body, [class*="st-"] {
-        font-family: 'Poppins', sans-serif !important;
-        color: #FFFFFF;
-    }
-    
-    /* Backgrounds */
-    .stApp {
-        background-color: #00243B;
-    }
-    
-    /* Containers - Fixed Spacing to prevent overlap */
-    div[data-testid="stForm"] {
-        background-color: #001829;
-        border: 1px solid #00FFFF;
-        border-radius: 15px;
-        padding: 30px; /* Increased padding */
-        box-shadow: 0 0 15px rgba(0, 255, 255, 0.1);
-        margin-bottom: 20px;
-    }
-    
-    /* Inputs */
-    .stTextInput > div > div > input, .stTextArea > div > div > textarea, .stSelectbox > div > div > div {
-        background-color: #00243B !important;
-        color: white !important;
-        border: 1px solid #005f73 !important;
-        border-radius: 8px;
-        margin-bottom: 10px; /* Added margin to inputs */
-    }
-
-    /* Radio Buttons */
-    .stRadio label {
-        color: white !important;
-        font-size: 16px !important;
-        background-color: #001829;
-        padding: 10px;
-        border-radius: 8px;
-        margin-bottom: 5px;
-        border: 1px solid #005f73;
-        width: 100%;
-        display: block;
-    }
-    
-    /* Headings */
-    h1, h2, h3 {
-        color: white !important;
-        text-align: center;
-    }
-    
-    /* Expander */
-    .streamlit-expanderHeader {
-        background-color: #001829 !important;
-        color: white !important;
-        border-radius: 8px;
-    }
-
-    /* --- BUTTON STYLING --- */
-    /* Target ANY button inside the Form Container */
-    div[data-testid="stForm"] button {
-        background: linear-gradient(90deg, #00C6FF 0%, #0072FF 100%) !important;
-        color: white !important;
-        font-family: 'Poppins', sans-serif !important;
-        font-weight: 700 !important;
-        font-size: 20px !important;
-        border: none !important;
-        border-radius: 8px !important;
-        padding: 15px 0px !important;
-        
-        /* Full Width & Centered */
-        width: 100% !important;
-        display: block !important;
-        margin: 0 auto !important;
-        
-        box-shadow: 0 0 15px rgba(0, 198, 255, 0.4);
-        transition: all 0.3s ease-in-out;
-    }
-
-    div[data-testid="stForm"] button:hover {
-        box-shadow: 0 0 30px rgba(0, 255, 255, 0.9);
-        transform: scale(1.01);
-        color: white !important;
-    }
-    
-    /* FOOTER STYLING */
-    .footer {
-        text-align: center;
-        color: #888888;
-        font-size: 12px;
-        margin-top: 50px;
-    }
-    </style>
-""", unsafe_allow_html=True)
+# Built, content-hashed stylesheet from styles/seven_day.css (see build_static_assets.py)
+use_stylesheet("seven_day")
 
 # --- ASSET LOADING ---
-@st.cache_data
-def load_lottiefile(filepath: str):
-    try:
-        with open(filepath, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
+# load_lottiefile comes from shared_resources, so all pages share one asset cache
 
 # Ensure these exist in your repo
 LOTTIE_WELCOME = "OrderPlaced.json" 
@@ -128,10 +48,10 @@ if 'topic_options' not in st.session_state:
     st.session_state.topic_options = []
 if 'selected_topic' not in st.session_state:
     st.session_state.selected_topic = ""
-if 'final_content' not in st.session_state:
-    st.session_state.final_content = ""
-if 'day_content' not in st.session_state:
-    st.session_state.day_content = []
+if 'plan' not in st.session_state:
+    st.session_state.plan = None  # {"handle", "intro", "days"}: the text itself lives in the content store
+if 'plan_error' not in st.session_state:
+    st.session_state.plan_error = None  # message of the last failed generation; set -> show it instead of regenerating
 if 'day_revealed' not in st.session_state:
     st.session_state.day_revealed = 0
 if 'mode' not in st.session_state: 
@@ -142,131 +62,102 @@ if 'temp_data_cache' not in st.session_state:
 
 # --- API SETUP ---
 try:
-    client = genai.Client(api_key=st.secrets["GEMINI_API_KEY"])
+    client = get_client(st.secrets["GEMINI_API_KEY"])
     api_ready = True
 except Exception:
     st.error("⚠️ System Error: GEMINI_API_KEY is missing in Streamlit Secrets.")
     api_ready = False
 
+bind_usage("seven_day")
+
+
+# --- SHARED RESOURCES (one per server process, shared by all sessions) ---
+@st.cache_resource
+def get_topic_flight():
+    return SingleFlight()
+
+@st.cache_resource
+def load_topic_index(path, mtime):
+    # mtime is only part of the cache key, so a re-run of the precompute job is picked up
+    return TopicIndex.load(path)
+
+def get_topic_index():
+    mtime = os.path.getmtime(INDEX_PATH) if os.path.exists(INDEX_PATH) else 0
+    return load_topic_index(INDEX_PATH, mtime)
+
+@st.cache_resource
+def get_content_store():
+    return ContentStore()
+
+
+# --- SESSION MEMORY ---
+# The plan is stored once in the content store; session state only holds its
+# handle and the character spans of the intro and each day.
+
+def plan_text():
+    """The full plan for this session, or None if it expired from the store."""
+    plan = st.session_state.plan
+    return get_content_store().get(plan["handle"]) if plan else None
+
+def plan_part(text, span):
+    return text[span[0]:span[1]]
+
+# Mark this session as active so its plan stays in memory; idle sessions are evicted.
+ctx = get_script_run_ctx()
+if ctx is not None:
+    plan = st.session_state.plan
+    get_content_store().touch(ctx.session_id, [plan["handle"]] if plan else [])
+
 
 # --- LOGIC FUNCTIONS ---
+# Prompts and calls live in seven_day_pipeline.py so offline jobs run the exact same steps.
 
 def generate_topic_options(user_input_data, mode):
     """
     Step 3A/3C Logic: Generates 3 strategic topic options.
     Gemini acts as a Market Analyst (Situational Awareness).
     """
-    system_instruction = """
-    You are an expert Content Strategist with deep knowledge of digital trends for late 2024 and 2025.
-    Your goal is to suggest 3 highly relevant, engaging content series topics based on the user's profile.
-    
-    For each option, provide:
-    1. A Catchy Series Title
-    2. A 1-sentence 'Why this works now' justification based on current trends.
-    
-    Output MUST be a valid JSON array of strings. 
-    Example: ["Title 1 - Why it works", "Title 2 - Why it works", "Title 3 - Why it works"]
-    """
-    
-    # Determine input context based on mode
-    input_context = user_input_data.get('topic_seed') if mode == "EXPAND" else "No specific topic provided. Find the best opportunity."
-
-    prompt_context = f"""
-    User Profile:
-    Niche: {user_input_data['niche']}
-    Audience: {user_input_data['audience']}
-    Goal: {user_input_data['goal']}
-    Tone: {user_input_data['tone']}
-    
-    Mode: {mode} (If EXPAND, build on input. If FIND, suggest new high-potential topics).
-    Input: {input_context}
-    """
+    # FIND mode only depends on the profile: answer from the precomputed index when close enough
+    if mode == "FIND":
+        match = get_topic_index().lookup(user_input_data)
+        if match:
+            return match[0]
+    
+    prompt_context = build_topic_prompt(user_input_data, mode)
+    
+    # Identical requests from other sessions (e.g. workshop attendees using the
+    # sample niche) wait on the same in-flight call instead of firing their own.
+    key = request_key(
+        mode, user_input_data['niche'], user_input_data['audience'],
+        user_input_data['goal'], user_input_data['tone'], topic_input_context(user_input_data, mode)
+    )
     
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt_context,
-            config=types.GenerateContentConfig(system_instruction=system_instruction, temperature=0.7)
+        # With the semantic cache on, a close niche/audience with the same mode, goal and tone
+        # shares an answer; an EXPAND seed is only ever matched exactly.
+        exact = request_key(mode, user_input_data['goal'], user_input_data['tone'], topic_input_context(user_input_data, mode))
+        near = (user_input_data['niche'], user_input_data['audience'])
+        options = semantic_cache.cached_call(
+            "topics", exact, near if mode == "FIND" else None,
+            get_topic_flight().do, key, fetch_topic_options, client, prompt_context
         )
-        # Clean markdown if present
-        text = response.text.replace('```json', '').replace('```', '').strip()
-        return json.loads(text)
+        return list(options)
+    except BudgetExceeded:
+        raise  # not a glitch to paper over with placeholder topics
     except Exception as e:
         st.error(f"Error generating topics: {e}")
         return ["Option 1: Trends Analysis", "Option 2: How-To Guide", "Option 3: Common Mistakes"]
 
-def generate_7_day_plan(selected_topic, user_data):
-    """
-    Step 4 Logic: The Heavy Lifting.
-    1. Strategy (ChatGPT Mimic)
-    2. Writing (Claude Mimic)
-    Returns the full text content.
-    """
-    
-    platforms_list = ", ".join(user_data['platforms'])
-
-    # PHASE 1: STRATEGY (ChatGPT Persona - Logic & Structure)
-    strat_system = """
-    You are a Master Content Planner (modeled after GPT-4's reasoning).
-    Create a detailed 7-day outline for this topic. 
-    Focus on narrative flow, engagement hooks, and high value.
-    Do NOT write the posts yet. Just the plan.
-    """
-    
-    strat_prompt = f"""
-    Plan a 7-Day Content Series.
-    Topic: {selected_topic}
-    Audience: {user_data['audience']}
-    Platforms: {platforms_list}
-    Goal: {user_data['goal']}
-    """
-    
-    strat_response = client.models.generate_content(
-        model='gemini-2.5-flash',
-        contents=strat_prompt,
-        config=types.GenerateContentConfig(system_instruction=strat_system, temperature=0.4)
-    )
-    strategy = strat_response.text
-    
-    # PHASE 2: WRITING (Claude Persona - Human & Nuanced)
-    write_system = """
-    You are a world-class Creative Writer (modeled after Claude 3 Opus).
-    Write the full content for the 7-Day Series based on the strategy provided.
-    
-    RULES:
-    1. No AI cliches ('Unlock', 'Unleash', 'In today's world', 'Deep dive').
-    2. Write in a human, engaging voice matching the user's tone.
-    3. For EACH DAY, write specific content for EACH selected platform.
-       - Label them clearly (e.g., [LinkedIn], [Twitter]).
-       - Include specific CTAs and Hashtags for each.
-    4. Add a small 'How-To Guide' at the very start of the file.
-    5. Include 'Game Mode' nudges (fun challenges) for each day.
-    
-    FORMAT:
-    The output must be a single text stream.
-    Use the exact delimiter '--- DAY [Number] ---' to separate days.
-    Example:
-    --- DAY 1 ---
-    (Content for Day 1)
-    --- DAY 2 ---
-    (Content for Day 2)
-    """
-    
-    write_prompt = f"""
-    Execute this Plan and write the full content.
-    User Tone: {user_data['tone']}
-    Target Platforms: {platforms_list}
-    
-    STRATEGY BLUEPRINT:
-    {strategy}
-    """
-    
-    final_response = client.models.generate_content(
-        model='gemini-2.5-flash',
-        contents=write_prompt,
-        config=types.GenerateContentConfig(system_instruction=write_system, temperature=0.8)
-    )
-    return final_response.text
+# Button callbacks run before the script does, so a press never waits on a model call first.
+def request_plan_retry():
+    st.session_state.plan_error = None
+
+def back_to_topics():
+    st.session_state.plan_error = None
+    st.session_state.stage = 'SCREEN_3_SELECTION'
+
+def back_to_inputs():
+    st.session_state.stage = 'SCREEN_2_A_INPUT' if st.session_state.mode == "EXPAND" else 'SCREEN_2'
 
 
 # --- UI NAVIGATION & RENDERING ---
@@ -332,6 +223,7 @@ elif st.session_state.stage == 'SCREEN_2':
             else:
                 st.session_state.user_data = {'niche': niche, 'audience': audience, 'goal': goal, 'tone': tone, 'platforms': platforms}
                 st.session_state.mode = "FIND"
+                start_usage_flow("seven_day")
                 st.session_state.stage = 'SCREEN_3_LOADING'
                 st.rerun()
 
@@ -360,16 +252,25 @@ elif st.session_state.stage == 'SCREEN_2_A_INPUT':
                 st.session_state.user_data = st.session_state.temp_data_cache
                 st.session_state.user_data['topic_seed'] = topic_in
                 st.session_state.mode = "EXPAND"
+                start_usage_flow("seven_day")
                 st.session_state.stage = 'SCREEN_3_LOADING'
                 st.rerun()
 
 # --- SCREEN 3: LOADING & OPTIONS ---
 elif st.session_state.stage == 'SCREEN_3_LOADING':
-    st.markdown("### 🧠 Analyzing Market Trends...")
-    st_lottie(load_lottiefile(LOTTIE_COOKING), height=200, key="cooking_analysis")
+    loading = st.empty()
+    with loading.container():
+        st.markdown("### 🧠 Analyzing Market Trends...")
+        st_lottie(load_lottiefile(LOTTIE_COOKING), height=200, key="cooking_analysis")
     
     # Generate Options using Gemini
-    options = generate_topic_options(st.session_state.user_data, st.session_state.mode)
+    try:
+        options = generate_topic_options(st.session_state.user_data, st.session_state.mode)
+    except BudgetExceeded as e:
+        loading.empty()
+        st.error(f"⚠️ {e}")
+        st.button("⬅️ Back", on_click=back_to_inputs)
+        st.stop()
     st.session_state.topic_options = options
     st.session_state.stage = 'SCREEN_3_SELECTION'
     st.rerun()
@@ -395,30 +296,47 @@ elif st.session_state.stage == 'SCREEN_3_SELECTION':
         
         if submit_selection:
             st.session_state.selected_topic = choice
+            st.session_state.plan_error = None
             st.session_state.stage = 'SCREEN_4_GENERATING'
             st.rerun()
 
 # --- SCREEN 4: GENERATION ---
 elif st.session_state.stage == 'SCREEN_4_GENERATING':
-    st.markdown("### 🏗️ Building your 7-Day Content System...")
-    st_lottie(load_lottiefile(LOTTIE_DELIVERY), height=200, key="delivering_final")
-    st.info("Gemini is creating your strategy... drafting scripts... and polishing hooks...")
-    
-    # Full Generation
-    full_content = generate_7_day_plan(st.session_state.selected_topic, st.session_state.user_data)
-    st.session_state.final_content = full_content
-    
-    # Parse into days (Simple split by delimiter)
-    content_parts = full_content.split("--- DAY")
+    # Only generate when there is no failure on screen; Retry clears it (request_plan_retry)
+    if st.session_state.plan_error is None:
+        loading = st.empty()
+        with loading.container():
+            st.markdown("### 🏗️ Building your 7-Day Content System...")
+            st_lottie(load_lottiefile(LOTTIE_DELIVERY), height=200, key="delivering_final")
+            st.info("Gemini is creating your strategy... drafting scripts... and polishing hooks...")
+        
+        # Full Generation (resumes from the saved strategy after a failure)
+        try:
+            full_content = generate_7_day_plan(client, st.session_state.selected_topic, st.session_state.user_data)
+        except Exception as e:
+            st.session_state.plan_error = str(e)
+        loading.empty()
+    
+    if st.session_state.plan_error is not None:
+        st.error(f"⚠️ Generation failed: {st.session_state.plan_error}")
+        saved = checkpoints.load(plan_checkpoint_key(st.session_state.selected_topic, st.session_state.user_data))
+        if 'strategy' in saved:
+            st.info("Your 7-day strategy is saved. Retrying only redoes the writing step.")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("🔁 Retry from Writing Step" if 'strategy' in saved else "🔁 Retry", on_click=request_plan_retry)
+        with col2:
+            st.button("⬅️ Back to Topics", on_click=back_to_topics)
+        st.stop()
     
-    # Store parts in session state
-    st.session_state.intro_content = content_parts[0] if len(content_parts) > 0 else ""
-    st.session_state.daily_content = []
+    # Local platform-rule pass (thread splitting, hashtag trimming, cliche check);
+    # only sections that are still broken go back to the model.
+    full_content, polish_report = polish_text(full_content, client)
+    st.session_state.polish_note = summarize_polish(polish_report)
     
-    # Re-add the "Day X" label to the split parts
-    for i, part in enumerate(content_parts[1:]):
-        day_num = i + 1
-        st.session_state.daily_content.append(f"**Day {day_num}**\n\n" + part)
+    # Store the plan once; days are read back as slices (split on the "--- DAY N ---" lines, see plan_days.py)
+    st.session_state.plan = compact_plan(get_content_store(), full_content)
+    complete_usage_flow("seven_day")
     
     st.session_state.day_revealed = 1
     st.session_state.stage = 'SCREEN_5_RESULT'
@@ -426,24 +344,36 @@ elif st.session_state.stage == 'SCREEN_4_GENERATING':
 
 # --- SCREEN 5: FINAL DASHBOARD (The Reveal) ---
 elif st.session_state.stage == 'SCREEN_5_RESULT':
+    full_content = plan_text()
+    if full_content is None:
+        st.warning("This plan has expired. Please generate a new one.")
+        if st.button("🔄 Start Again"):
+            st.session_state.plan = None
+            st.session_state.stage = 'SCREEN_1'
+            st.rerun()
+        st.stop()
+    days = st.session_state.plan["days"]
+    
     st.balloons()
     st.markdown("## 🎉 You are all set to rule the week!")
     st.success("Your 7-Day Series is ready. Click below to reveal each day.")
+    if st.session_state.get('polish_note'):
+        st.caption(f"🧹 {st.session_state.polish_note}")
     
     # 1. Show Intro/Guide First
     with st.expander("📘 READ FIRST: Your How-To Guide", expanded=False):
-        st.markdown(st.session_state.intro_content)
+        st.markdown(plan_part(full_content, st.session_state.plan["intro"]))
     
     # 2. Reveal Mechanism
     for i in range(st.session_state.day_revealed):
-        if i < len(st.session_state.daily_content):
-            day_text = st.session_state.daily_content[i]
+        if i < len(days):
+            day_text = f"**Day {i+1}**\n\n" + plan_part(full_content, days[i])
             # We use expanders for each day
             with st.expander(f"📅 Content for Day {i+1}", expanded=True):
                 st.markdown(day_text)
     
     # 3. The "Next Day" Button
-    if st.session_state.day_revealed < len(st.session_state.daily_content):
+    if st.session_state.day_revealed < len(days):
         if st.button("👇 Generate Next Day"):
             st.session_state.day_revealed += 1
             st.rerun()
@@ -452,12 +382,21 @@ elif st.session_state.stage == 'SCREEN_5_RESULT':
 
     st.markdown("---")
     
-    # 4. Single File Download
+    # 4. Download - built only when clicked (and cached by content hash), so the
+    #    plan is not re-sent to the browser on every rerun
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        export_fmt = st.selectbox("Download format", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f]["label"])
+    start_date = None
+    if EXPORT_FORMATS[export_fmt].get("plan_only"):
+        with col2:
+            start_date = st.date_input("First posting day", value=datetime.date.today() + datetime.timedelta(days=1))
     st.download_button(
-        label="📥 Download Complete 7-Day Plan (Text File)",
-        data=st.session_state.final_content,
-        file_name="RizenAi_7Day_Plan.txt",
-        mime="text/plain",
+        label=f"📥 Download Complete 7-Day Plan ({EXPORT_FORMATS[export_fmt]['label']})",
+        data=lazy_export(full_content, export_fmt, "RizenAi 7-Day Plan", start_date),
+        file_name=file_name("RizenAi_7Day_Plan", export_fmt),
+        mime=EXPORT_FORMATS[export_fmt]["mime"],
+        on_click="ignore",
         use_container_width=True
     )
     
@@ -465,3 +404,15 @@ elif st.session_state.stage == 'SCREEN_5_RESULT':
     st.markdown("---")
     st.caption("RizenAi - Plug -> Play -> Profit")
     st.markdown("[Instagram](https://instagram.com) | [LinkedIn](https://linkedin.com)")
+
+# --- CALL METRICS (hedging / coalescing / failover) ---
+if HEDGING_ENABLED or SHOW_METRICS or FAILOVER_ENABLED or semantic_cache.SEMANTIC_CACHE_ENABLED:
+    with st.sidebar.expander("⏱️ Call Metrics"):
+        st.json({
+            "hedging": hedge_metrics(),
+            "backends": backend_status(),
+            "topic_coalescing": get_topic_flight().stats(),
+            "topic_index": dict(get_topic_index().stats, entries=len(get_topic_index())),
+            "semantic_cache": semantic_cache.stats(),
+            "content_store": get_content_store().stats(),
+        })
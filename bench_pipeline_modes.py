@@ -0,0 +1,113 @@
+"""Offline A/B benchmark of the Content Repurposer pipeline modes.
+
+Runs the same sample submissions through the three-stage, two-stage and fused
+modes and records latency, token usage and output structure validity, so we can
+pick the fastest mode that still meets the quality bar.
+
+Usage:
+    GEMINI_API_KEY=... python bench_pipeline_modes.py --runs 3 --out bench_output.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from llm_calls import make_client, track_usage
+from repurposer_pipeline import (
+    PIPELINE_MODES, api_call_step1_captain, api_call_step2_sous_chef, api_call_step3_chef,
+    api_call_planner, api_call_fused, check_structure,
+)
+
+SAMPLES = [
+    {
+        "name": "Sudip", "profession": "Solopreneur Coach", "objective": "Reach More People",
+        "tone": "Informative and Professional", "extra_info": "Primary CTA is 'Visit rizenai.co'",
+        "platforms": ["LinkedIn Post", "Twitter/X Thread"],
+        "original_content": (
+            "Most solopreneurs burn out not because they work too much, but because they switch context "
+            "all day. Batching similar tasks - content on Monday, sales calls on Tuesday, admin on Friday - "
+            "gave me back ten hours a week. The trick is protecting those blocks like client meetings."
+        ),
+    },
+    {
+        "name": "Asha", "profession": "Career Restart Mentor for Women", "objective": "Build Authority",
+        "tone": "Empathetic, encouraging", "extra_info": "",
+        "platforms": ["LinkedIn Post", "Instagram Reel Script", "Email Newsletter"],
+        "original_content": (
+            "Returning to work after a five-year break felt impossible until I reframed the gap. Caring for "
+            "family taught me negotiation, budgeting and crisis management. Recruiters listened once I told "
+            "that story with numbers instead of apologising for it."
+        ),
+    },
+]
+
+
+def run_mode(client, mode, sample):
+    """Runs one submission through one mode. Returns the output in the mode's native format."""
+    platforms_str = ", ".join(sample["platforms"])
+    user_profile = (
+        f"Name: {sample['name']}, Profession: {sample['profession']}, Objective: {sample['objective']}, "
+        f"Tone: {sample['tone']}, Extra: {sample['extra_info']}"
+    )
+    if mode == "fused":
+        return api_call_fused(client, sample)
+    if mode == "two_stage":
+        production_prompt = api_call_planner(client, sample["original_content"], user_profile, platforms_str)
+    else:
+        order_block = api_call_step1_captain(client, sample["original_content"], user_profile, platforms_str)
+        production_prompt = api_call_step2_sous_chef(client, order_block, sample["original_content"], platforms_str)
+    return api_call_step3_chef(client, production_prompt)
+
+
+def bench(client, modes, runs):
+    records = []
+    for run in range(runs):
+        for sample_index, sample in enumerate(SAMPLES):
+            for mode in modes:
+                record = {"mode": mode, "run": run, "sample": sample_index}
+                start = time.perf_counter()
+                with track_usage() as usage:
+                    try:
+                        output = run_mode(client, mode, sample)
+                        record.update(check_structure(output, sample["platforms"], mode))
+                    except Exception as e:
+                        record.update(valid=False, error=str(e))
+                record["latency_s"] = round(time.perf_counter() - start, 3)
+                record["calls"] = len(usage)
+                for field in ("prompt_tokens", "output_tokens", "thinking_tokens"):
+                    record[field] = sum(u[field] for u in usage)
+                records.append(record)
+                print(json.dumps(record), flush=True)
+    return records
+
+
+def summarize(records, modes):
+    print(f"\n{'mode':<12}{'n':>4}{'p50 s':>9}{'max s':>9}{'tokens':>10}{'valid':>8}")
+    for mode in modes:
+        rows = [r for r in records if r["mode"] == mode]
+        if not rows:
+            continue
+        latencies = [r["latency_s"] for r in rows]
+        tokens = statistics.mean(r["prompt_tokens"] + r["output_tokens"] + r["thinking_tokens"] for r in rows)
+        valid = sum(1 for r in rows if r.get("valid")) / len(rows)
+        print(f"{mode:<12}{len(rows):>4}{statistics.median(latencies):>9.2f}{max(latencies):>9.2f}{tokens:>10.0f}{valid:>8.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=list(PIPELINE_MODES), default=list(PIPELINE_MODES))
+    parser.add_argument("--runs", type=int, default=3, help="repetitions of every sample per mode")
+    parser.add_argument("--out", help="also write one JSON record per line to this file")
+    args = parser.parse_args()
+
+    client = make_client(os.environ["GEMINI_API_KEY"])
+    records = bench(client, args.modes, args.runs)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+    summarize(records, args.modes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Memory benchmark for the 7-day app's per-session state.
+
+Builds N simulated sessions as they look on the result screen, once with the
+old layout (full plan + intro copy + a labelled copy of every day) and once
+with the compact layout (content-store handle + day offsets), and reports
+traced bytes per session. Runs offline; no API key needed.
+
+Usage:
+    python bench_session_memory.py --sessions 1 10 100 1000 --distinct-plans 0
+"""
+import argparse
+import random
+import tempfile
+import tracemalloc
+
+from content_store import ContentStore, compact_plan
+
+USER_DATA = {"niche": "Digital Marketing", "audience": "Solopreneurs", "goal": "Authority", "tone": "Professional",
+             "platforms": ["LinkedIn", "Twitter/X", "Instagram"]}
+TOPICS = ["Option 1: Trends Analysis", "Option 2: How-To Guide", "Option 3: Common Mistakes"]
+
+
+def sample_plan(seed, words_per_day=450):
+    """A plan shaped like the model's: a guide, then seven '--- DAY N ---' sections."""
+    rng = random.Random(seed)
+    vocabulary = ["content", "audience", "hook", "story", "growth", "client", "system", "week", "post", "insight",
+                  "strategy", "trust", "proof", "offer", "lesson", "mistake", "result", "habit", "focus", "value"]
+    text = "# How to use this plan\n\n" + " ".join(rng.choices(vocabulary, k=200)) + "\n\n"
+    for day in range(1, 8):
+        text += f"--- DAY {day} ---\n"
+        for platform in USER_DATA["platforms"]:
+            text += f"## {platform}\n" + " ".join(rng.choices(vocabulary, k=words_per_day // 3)) + "\n\n"
+    return text
+
+
+def legacy_session(text):
+    parts = text.split("--- DAY")
+    return {
+        "stage": "SCREEN_5_RESULT", "user_data": dict(USER_DATA), "temp_data_cache": {}, "topic_options": list(TOPICS),
+        "selected_topic": TOPICS[1], "mode": "FIND", "day_revealed": 7, "day_content": [],
+        "final_content": text, "intro_content": parts[0],
+        "daily_content": [f"**Day {i + 1}**\n\n" + part for i, part in enumerate(parts[1:])],
+    }
+
+
+def compact_session(store, text):
+    return {
+        "stage": "SCREEN_5_RESULT", "user_data": dict(USER_DATA), "temp_data_cache": {}, "topic_options": list(TOPICS),
+        "selected_topic": TOPICS[1], "mode": "FIND", "day_revealed": 7,
+        "plan": compact_plan(store, text),
+    }
+
+
+def measure(sessions, distinct_plans, layout, directory):
+    """Traced bytes held after building the sessions (plans are generated inside the trace for both layouts)."""
+    store = ContentStore(directory=directory, idle_ttl=0)
+    tracemalloc.start()
+    held = []
+    for i in range(sessions):
+        text = sample_plan(i % distinct_plans if distinct_plans else i)
+        held.append(legacy_session(text) if layout == "legacy" else compact_session(store, text))
+        del text
+    live = tracemalloc.get_traced_memory()[0]
+    evicted = None
+    if layout == "compact":
+        for i, session in enumerate(held):
+            store.touch(f"session-{i}", [session["plan"]["handle"]])
+        store.evict_idle()  # idle_ttl=0: every session counts as idle, so the texts drop back to disk
+        evicted = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return live, evicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--distinct-plans", type=int, default=0,
+                        help="number of different plans shared by the sessions (0 = every session has its own)")
+    args = parser.parse_args()
+
+    print(f"{'sessions':>8} {'legacy B/session':>17} {'compact B/session':>18} {'saved':>7} {'after idle evict':>17}")
+    for n in args.sessions:
+        with tempfile.TemporaryDirectory() as directory:
+            legacy, _ = measure(n, args.distinct_plans, "legacy", directory)
+            compact, evicted = measure(n, args.distinct_plans, "compact", directory)
+        print(f"{n:>8} {legacy / n:>17,.0f} {compact / n:>18,.0f} {1 - compact / legacy:>7.0%} {evicted / n:>17,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Builds the files the apps serve from static/ (server.enableStaticServing).
+
+- static/fonts/poppins-<weight>-latin.woff2: Poppins cut down to the Latin
+  range Google Fonts uses, from the OFL TTFs in --font-dir (for example the
+  files/ folder of the fontpkg-poppins wheel). Needs fontTools and brotli,
+  which are build-time tools only and not in requirements.txt.
+- static/css/<name>.<hash>.css: each styles/<name>.css with the @font-face
+  rules in front, named by content hash so browsers can cache it for good.
+  static/css/manifest.json maps each name to its current file.
+
+Usage:
+    python build_static_assets.py --font-dir ~/fontpkg_poppins/files   # fonts and stylesheets
+    python build_static_assets.py                                        # stylesheets only
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STYLE_DIR = os.path.join(ROOT, "styles")
+FONT_OUT = os.path.join(ROOT, "static", "fonts")
+CSS_OUT = os.path.join(ROOT, "static", "css")
+MANIFEST = os.path.join(CSS_OUT, "manifest.json")
+
+FONT_WEIGHTS = {300: "Light", 400: "Regular", 500: "Medium", 600: "SemiBold", 700: "Bold"}
+LATIN_RANGE = (
+    "U+0000-00FF, U+0131, U+0152-0153, U+02BB-02BC, U+02C6, U+02DA, U+02DC, U+0304, U+0308, U+0329, "
+    "U+2000-206F, U+20AC, U+2122, U+2191, U+2193, U+2212, U+2215, U+FEFF, U+FFFD"
+)
+
+
+def font_file(weight):
+    return f"poppins-{weight}-latin.woff2"
+
+
+def build_fonts(font_dir):
+    from fontTools import subset  # build-time dependency
+
+    os.makedirs(FONT_OUT, exist_ok=True)
+    unicodes = []
+    for part in LATIN_RANGE.split(","):
+        start, _, end = part.strip()[2:].partition("-")
+        unicodes.extend(range(int(start, 16), int(end or start, 16) + 1))
+    for weight, style_name in FONT_WEIGHTS.items():
+        options = subset.Options()
+        options.flavor = "woff2"
+        options.layout_features = ["kern", "liga", "calt", "locl", "mark", "mkmk"]
+        source = os.path.join(font_dir, f"Poppins-{style_name}.ttf")
+        font = subset.load_font(source, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=unicodes)
+        subsetter.subset(font)
+        target = os.path.join(FONT_OUT, font_file(weight))
+        subset.save_font(font, target, options)
+        print(f"{os.path.basename(source)}: {os.path.getsize(source):,} B -> {font_file(weight)}: {os.path.getsize(target):,} B")
+    license_path = os.path.join(os.path.dirname(os.path.normpath(font_dir)), "LICENSE")
+    if os.path.exists(license_path):
+        shutil.copyfile(license_path, os.path.join(FONT_OUT, "OFL.txt"))
+
+
+def font_face_css():
+    # Relative to static/css/, so the stylesheet works under any server.baseUrlPath.
+    # font-display: swap paints text in the fallback font right away instead of waiting for the file.
+    return "".join(
+        f"@font-face {{\n    font-family: 'Poppins';\n    font-style: normal;\n    font-weight: {weight};\n"
+        f"    font-display: swap;\n    src: url('../fonts/{font_file(weight)}') format('woff2');\n"
+        f"    unicode-range: {LATIN_RANGE};\n}}\n"
+        for weight in FONT_WEIGHTS
+    )
+
+
+def build_stylesheets():
+    os.makedirs(CSS_OUT, exist_ok=True)
+    manifest = {}
+    for path in sorted(glob.glob(os.path.join(STYLE_DIR, "*.css"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "r", encoding="utf-8") as f:
+            css = font_face_css() + "\n" + f.read()
+        digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+        manifest[name] = f"{name}.{digest}.css"
+        with open(os.path.join(CSS_OUT, manifest[name]), "w", encoding="utf-8") as f:
+            f.write(css)
+        print(f"{name}: {manifest[name]} ({len(css.encode('utf-8')):,} B)")
+    # Drop stylesheets from earlier builds
+    for path in glob.glob(os.path.join(CSS_OUT, "*.css")):
+        if os.path.basename(path) not in manifest.values():
+            os.remove(path)
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--font-dir", help="folder with the Poppins-<Style>.ttf files; fonts are rebuilt only if given")
+    args = parser.parse_args()
+    if args.font_dir:
+        build_fonts(args.font_dir)
+    build_stylesheets()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Content-addressed store for large generated text.
+
+Sessions keep only a short handle (a hash) in st.session_state; the text lives
+here once, however many sessions hold it. Blobs referenced by recently active
+sessions stay in memory. When a session goes idle its references are dropped
+and unreferenced blobs fall back to disk, where they are kept for DISK_TTL so
+a returning user can still get their plan back.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from plan_days import day_spans
+
+CONTENT_DIR = os.getenv("RIZEN_CONTENT_DIR", os.path.join(".rizen_cache", "content"))
+IDLE_TTL = int(os.getenv("RIZEN_SESSION_IDLE_TTL", str(30 * 60)))   # seconds before a session counts as idle
+DISK_TTL = 7 * 24 * 3600                                             # seconds a blob is kept on disk
+EVICT_INTERVAL = 60                                                  # run eviction at most this often
+
+
+class ContentStore:
+    def __init__(self, directory=CONTENT_DIR, idle_ttl=IDLE_TTL):
+        self.directory = directory
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._memory = {}     # handle -> text
+        self._sessions = {}   # session id -> (last seen, set of handles)
+        self._last_evict = 0.0
+        self._evicted_sessions = 0
+
+    def _path(self, handle):
+        return os.path.join(self.directory, f"{handle}.txt")
+
+    def put(self, text):
+        """Stores text once and returns its handle."""
+        handle = hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+        with self._lock:
+            if handle in self._memory:
+                return handle
+            self._memory[handle] = text
+        path = self._path(handle)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return handle
+
+    def get(self, handle):
+        """Returns the text for a handle, reloading it from disk if it was evicted; None if gone."""
+        with self._lock:
+            text = self._memory.get(handle)
+        if text is not None:
+            return text
+        try:
+            with open(self._path(handle), "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._memory[handle] = text
+        return text
+
+    def touch(self, session_id, handles):
+        """Marks a session as active and holding these handles. Runs eviction now and then."""
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (now, set(handles))
+            due = now - self._last_evict >= EVICT_INTERVAL
+        if due:
+            self.evict_idle()
+
+    def evict_idle(self):
+        """Forgets idle sessions and drops blobs no active session holds from memory."""
+        now = time.monotonic()
+        with self._lock:
+            self._last_evict = now
+            idle = [sid for sid, (seen, _) in self._sessions.items() if now - seen > self.idle_ttl]
+            for sid in idle:
+                del self._sessions[sid]
+            self._evicted_sessions += len(idle)
+            live = set().union(*(handles for _, handles in self._sessions.values()))
+            for handle in [h for h in self._memory if h not in live]:
+                del self._memory[handle]
+        self._prune_disk()
+        return len(idle)
+
+    def _prune_disk(self):
+        cutoff = time.time() - DISK_TTL
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "blobs_in_memory": len(self._memory),
+                "bytes_in_memory": sum(len(t.encode("utf-8")) for t in self._memory.values()),
+                "active_sessions": len(self._sessions),
+                "evicted_sessions": self._evicted_sessions,
+            }
+
+
+# --- COMPACT PLAN MODEL ---
+
+def day_offsets(text):
+    """Character spans of the intro and of each day's body in a 7-day plan (see plan_days.py)."""
+    intro, days = day_spans(text)
+    return intro, [span for _, span in days]
+
+
+def compact_plan(store, text):
+    """The session-state record for a plan: a handle plus offsets, no text."""
+    intro, days = day_offsets(text)
+    return {"handle": store.put(text), "intro": intro, "days": days}
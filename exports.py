@@ -0,0 +1,220 @@
+"""Export engine for generated plans and deliverables.
+
+Exports are built lazily: the apps hand st.download_button a zero-argument
+callable (lazy_export), so nothing is built or sent to the browser until
+someone actually clicks download. Built files are cached by content hash,
+so a second click (or another session with the same plan) is free.
+
+Formats: plain text, Markdown, DOCX (hand-written OOXML, no extra
+dependency), a per-day/per-platform CSV posting schedule and an ICS
+calendar for the 7-day plan.
+"""
+import csv
+import datetime
+import functools
+import hashlib
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from plan_days import day_spans, is_day_delimiter
+from platform_rules import split_sections
+
+EXPORT_FORMATS = {
+    "txt": {"label": "Text (.txt)", "mime": "text/plain", "ext": "txt"},
+    "md": {"label": "Markdown (.md)", "mime": "text/markdown", "ext": "md"},
+    "docx": {"label": "Word (.docx)", "mime": "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "ext": "docx"},
+    "csv": {"label": "Posting Schedule (.csv)", "mime": "text/csv", "ext": "csv", "plan_only": True},
+    "ics": {"label": "Calendar (.ics)", "mime": "text/calendar", "ext": "ics", "plan_only": True},
+}
+
+# Suggested local posting time per platform family, used by the schedule and calendar.
+POSTING_TIMES = {"linkedin": "09:00", "twitter": "12:00", "instagram": "18:00", "facebook": "13:00", "blog": "10:00", "email": "08:00", "youtube": "17:00"}
+DEFAULT_POSTING_TIME = "10:00"
+
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# --- PLAN PARSING ---
+
+def split_days(plan_text):
+    """Splits a 7-day plan on its '--- DAY N ---' delimiters. Returns (intro, [(day_number, body), ...])."""
+    (intro_start, intro_end), days = day_spans(plan_text)
+    return plan_text[intro_start:intro_end], [(number, plan_text[start:end]) for number, (start, end) in days]
+
+
+def _first_line(text, limit=90):
+    for line in text.strip().splitlines():
+        line = line.strip(" *#-_>").strip()
+        if line:
+            return line if len(line) <= limit else line[:limit - 1] + "…"
+    return ""
+
+
+def _day_posts(body):
+    """One day's posts as (heading, platform family, text), covering the whole day.
+
+    A post runs from its platform heading to the next platform heading, so its
+    own labels, lists and closing hashtags stay with it. Text before the first
+    heading is kept as a post of its own. If the posts do not add up to the
+    day's body, the day is exported as one post rather than losing text.
+    """
+    sections = split_sections(body, platforms_only=True)
+    lead_end = sections[0]["heading_start"] if sections else len(body)
+    spans = [(None, None, 0, 0, lead_end)] if body[:lead_end].strip() else []
+    spans += [(s["heading"], s["platform"], s["heading_start"], s["start"], s["end"]) for s in sections]
+    covered = "".join(body[start:end] for _, _, start, _, end in spans)
+    if covered.strip() != body.strip():
+        return [(None, None, body)]
+    return [(heading, platform, body[text_start:end]) for heading, platform, _, text_start, end in spans]
+
+
+def schedule_rows(plan_text, start_date):
+    """One row per day and platform post: date, time, day, platform, hook, characters, text."""
+    _, days = split_days(plan_text)
+    rows = []
+    for day_number, body in days:
+        date = start_date + datetime.timedelta(days=day_number - 1)
+        for heading, platform, text in _day_posts(body):
+            rows.append({
+                "date": date.isoformat(),
+                "time": POSTING_TIMES.get(platform, DEFAULT_POSTING_TIME),
+                "day": day_number,
+                "platform": (heading or "").strip("#*[]_: ").strip() or platform or f"Day {day_number}",
+                "hook": _first_line(text),
+                "characters": len(text.strip()),
+                "text": text.strip(),
+            })
+    return rows
+
+
+# --- BUILDERS ---
+
+def build_docx(text, title):
+    """Minimal Word document: one paragraph per line, headings and DAY lines in bold."""
+    paragraphs = []
+    for line in [title, ""] + text.splitlines():
+        bold = line.startswith("#") or is_day_delimiter(line) or line == title
+        clean = escape(line.lstrip("#").replace("**", "").strip() if bold else line.replace("**", ""))
+        run_props = "<w:rPr><w:b/></w:rPr>" if bold else ""
+        paragraphs.append(f'<w:p><w:r>{run_props}<w:t xml:space="preserve">{clean}</w:t></w:r></w:p>')
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        + "".join(paragraphs) + "</w:body></w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ))
+        docx.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+            '</Relationships>'
+        ))
+        docx.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+def build_schedule_csv(plan_text, start_date):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["date", "time", "day", "platform", "hook", "characters", "text"])
+    writer.writeheader()
+    writer.writerows(schedule_rows(plan_text, start_date))
+    return buffer.getvalue().encode("utf-8-sig")  # BOM so Excel opens emoji/UTF-8 correctly
+
+
+def _ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _ics_fold(line):
+    """RFC 5545 line folding: at most 75 octets per line, continuation lines start with a space."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    pieces, current = [], b""
+    for char in line:
+        char_bytes = char.encode("utf-8")
+        if len(current) + len(char_bytes) > (75 if not pieces else 74):
+            pieces.append(current.decode("utf-8"))
+            current = b""
+        current += char_bytes
+    pieces.append(current.decode("utf-8"))
+    return "\r\n ".join(pieces)
+
+
+def build_ics(plan_text, start_date, title):
+    """One 30-minute event per day and platform post, in floating local time."""
+    digest = content_hash(plan_text)
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//RizenAi//7-Day Content System//EN", "CALSCALE:GREGORIAN",
+             f"X-WR-CALNAME:{_ics_escape(title)}"]
+    for index, row in enumerate(schedule_rows(plan_text, start_date)):
+        start = datetime.datetime.fromisoformat(f"{row['date']}T{row['time']}")
+        end = start + datetime.timedelta(minutes=30)
+        summary = f"Day {row['day']} · {row['platform']}: {row['hook']}"
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{digest}-{index}@rizenai.co",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{start:%Y%m%dT%H%M%S}",
+            f"DTEND:{end:%Y%m%dT%H%M%S}",
+            f"SUMMARY:{_ics_escape(summary)}",
+            f"DESCRIPTION:{_ics_escape(row['text'])}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(_ics_fold(line) for line in lines) + "\r\n").encode("utf-8")
+
+
+# --- CACHED, LAZY ENTRY POINTS ---
+
+def export_bytes(text, fmt, title="RizenAi Content", start_date=None):
+    """Builds (or returns the cached) export of text in the given format."""
+    start_date = start_date or datetime.date.today() + datetime.timedelta(days=1)
+    key = (content_hash(text), fmt, title, start_date.isoformat() if EXPORT_FORMATS[fmt].get("plan_only") else None)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    if fmt == "docx":
+        data = build_docx(text, title)
+    elif fmt == "csv":
+        data = build_schedule_csv(text, start_date)
+    elif fmt == "ics":
+        data = build_ics(text, start_date, title)
+    else:
+        data = text.encode("utf-8")
+
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
+
+
+def lazy_export(text, fmt, title="RizenAi Content", start_date=None):
+    """Zero-argument callable for st.download_button(data=...): built only on click."""
+    return functools.partial(export_bytes, text, fmt, title, start_date)
+
+
+def file_name(base, fmt):
+    return f"{base}.{EXPORT_FORMATS[fmt]['ext']}"
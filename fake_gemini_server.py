@@ -0,0 +1,201 @@
+"""Local HTTP stand-in for the Gemini API, for load tests.
+
+Answers generateContent and streamGenerateContent (SSE) with canned text
+shaped like the real thing: topic options as a JSON array, a strategy, a
+7-day plan with '--- DAY N ---' delimiters, or one string per key when a
+response schema is given. Latency is configurable so we can see where a
+replica saturates without spending tokens.
+
+It also answers as an OpenAI-compatible server (/v1/models and
+/v1/chat/completions), and --throttle makes that share of Gemini calls
+fail with 429, so failover to a local backend can be tried end to end.
+
+Usage:
+    python fake_gemini_server.py --port 8765 --latency 2.0 --jitter 0.5
+    RIZEN_GEMINI_BASE_URL=http://127.0.0.1:8765 streamlit run Rizen_7Day_System.py
+
+    python fake_gemini_server.py --port 8765 --throttle 1.0           # Gemini always throttled
+    RIZEN_GEMINI_BASE_URL=http://127.0.0.1:8765 RIZEN_LOCAL_LLM_URL=http://127.0.0.1:8765/v1 \
+        streamlit run Rizen_7Day_System.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ["content", "audience", "hook", "story", "growth", "client", "system", "week", "post", "insight",
+         "strategy", "trust", "proof", "offer", "lesson", "mistake", "result", "habit", "focus", "value"]
+STREAM_CHUNKS = 20
+
+
+def canned_text(request, plan_words):
+    """Picks a plausible answer for the request, based on the prompt and config."""
+    prompt = json.dumps(request.get("contents", "")) + json.dumps(request.get("systemInstruction", ""))
+    schema = (request.get("generationConfig") or {}).get("responseSchema")
+    rng = random.Random(len(prompt))
+    if schema:
+        if schema.get("type", "").lower() == "array":
+            return json.dumps(["fixed"] * max(1, prompt.count("POST ")))
+        return json.dumps({key: " ".join(rng.choices(WORDS, k=120)) for key in schema.get("properties", {})})
+    if "JSON array of strings" in prompt:
+        return json.dumps([f"Series {i}: The {rng.choice(WORDS)} {rng.choice(WORDS)} - why it works now" for i in (1, 2, 3)])
+    if "STRATEGY BLUEPRINT" in prompt:
+        text = "How-To Guide\n" + " ".join(rng.choices(WORDS, k=80)) + "\n\n"
+        for day in range(1, 8):
+            text += f"--- DAY {day} ---\n[LinkedIn]\n" + " ".join(rng.choices(WORDS, k=plan_words // 7)) + " #growth\n\n"
+        return text
+    return " ".join(rng.choices(WORDS, k=300))
+
+
+def as_gemini_request(chat):
+    """An OpenAI chat request in the shape canned_text reads."""
+    messages = chat.get("messages", [])
+    schema = ((chat.get("response_format") or {}).get("json_schema") or {}).get("schema")
+    return {
+        "contents": [m["content"] for m in messages if m.get("role") != "system"],
+        "systemInstruction": [m["content"] for m in messages if m.get("role") == "system"],
+        "generationConfig": {"responseSchema": schema} if schema else {},
+    }
+
+
+def make_handler(latency, jitter, plan_words, stats, throttle=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _usage(self, text):
+            return {"promptTokenCount": 200, "candidatesTokenCount": len(text) // 4, "totalTokenCount": 200 + len(text) // 4}
+
+        def _chunk(self, text, usage=None):
+            body = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+            if usage is not None:
+                body["candidates"][0]["finishReason"] = "STOP"
+                body["usageMetadata"] = usage
+            return body
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            chat = self.path.startswith("/v1/chat/completions")
+            if not chat and throttle and random.random() < throttle:
+                with stats["lock"]:
+                    stats["throttled"] += 1
+                return self._send_json({"error": {"code": 429, "message": "Resource exhausted (fake throttle).",
+                                                  "status": "RESOURCE_EXHAUSTED"}}, status=429)
+            with stats["lock"]:
+                stats["requests"] += 1
+                stats["chat_requests"] += chat
+                stats["in_flight"] += 1
+                stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+            try:
+                delay = max(0.0, random.gauss(latency, jitter)) if jitter else latency
+                if chat:
+                    text = canned_text(as_gemini_request(request), plan_words)
+                    if request.get("stream"):
+                        self._stream_chat(text, delay)
+                    else:
+                        time.sleep(delay)
+                        self._send_json({"choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                                      "finish_reason": "stop"}], "usage": self._chat_usage(text)})
+                    return
+                text = canned_text(request, plan_words)
+                if ":streamGenerateContent" in self.path:
+                    self._stream(text, delay)
+                else:
+                    time.sleep(delay)
+                    self._send_json(self._chunk(text, self._usage(text)))
+            finally:
+                with stats["lock"]:
+                    stats["in_flight"] -= 1
+
+        def _chat_usage(self, text):
+            return {"prompt_tokens": 200, "completion_tokens": len(text) // 4, "total_tokens": 200 + len(text) // 4}
+
+        def _send_json(self, body, status=200):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, text, delay):
+            # Half the latency before the first token, the rest spread over the chunks.
+            time.sleep(delay / 2)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            size = max(1, len(text) // STREAM_CHUNKS + 1)
+            pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+            for i, piece in enumerate(pieces):
+                usage = self._usage(text) if i == len(pieces) - 1 else None
+                self.wfile.write(f"data: {json.dumps(self._chunk(piece, usage))}\r\n\r\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(delay / 2 / len(pieces))
+            self.close_connection = True
+
+        def _stream_chat(self, text, delay):
+            time.sleep(delay / 2)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            size = max(1, len(text) // STREAM_CHUNKS + 1)
+            for i in range(0, len(text), size):
+                chunk = {"choices": [{"index": 0, "delta": {"content": text[i:i + size]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(delay / 2 / STREAM_CHUNKS)
+            self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': self._chat_usage(text)})}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+        def do_GET(self):
+            """Counters; '?reset' starts a new measurement window after reading them."""
+            if self.path.startswith("/v1/models"):
+                return self._send_json({"object": "list", "data": [{"id": "fake-local", "object": "model"}]})
+            with stats["lock"]:
+                body = {key: value for key, value in stats.items() if key != "lock"}
+                if "reset" in self.path:
+                    stats["requests"] = stats["chat_requests"] = stats["throttled"] = 0
+                    stats["peak_in_flight"] = stats["in_flight"]
+            self._send_json(body)
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128   # the default of 5 drops connections when a load test opens dozens at once
+
+
+def serve(port=8765, latency=2.0, jitter=0.0, plan_words=2800, host="127.0.0.1", throttle=0.0):
+    """Starts the server in a background thread. Returns it; call .shutdown() to stop."""
+    stats = {"lock": threading.Lock(), "requests": 0, "chat_requests": 0, "throttled": 0, "in_flight": 0, "peak_in_flight": 0}
+    server = _Server((host, port), make_handler(latency, jitter, plan_words, stats, throttle))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=2.0, help="seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the latency, in seconds")
+    parser.add_argument("--plan-words", type=int, default=2800, help="length of the generated 7-day plan")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of Gemini calls answered with 429")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.jitter, args.plan_words, throttle=args.throttle)
+    print(f"Fake Gemini API on http://127.0.0.1:{args.port} (latency {args.latency}s ± {args.jitter}s)", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Local Redis stand-in for trying the shared state backend without Redis.
+
+Speaks enough of the Redis protocol for state_backend.RedisBackend (and
+redis-cli): PING, AUTH, SELECT, GET, SET [EX], DEL, INCR, INCRBY, EXPIRE,
+DBSIZE and FLUSHDB. Data lives in a MemoryBackend, so two app processes
+pointed at this server share caches, checkpoints and quotas as they would
+with Redis.
+
+Usage:
+    python fake_redis_server.py --port 6390
+    RIZEN_STATE_BACKEND=redis://127.0.0.1:6390 streamlit run Rizen_7Day_System.py
+"""
+import argparse
+import socketserver
+import threading
+
+from state_backend import MemoryBackend
+
+
+def encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    data = str(value).encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class Store:
+    def __init__(self):
+        self.data = MemoryBackend()
+        self.lock = threading.Lock()   # INCR + EXPIRE and SET EX are single commands here
+
+    def run(self, args):
+        name = args[0].upper()
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name in ("AUTH", "SELECT"):
+            return b"+OK\r\n"
+        if name == "GET":
+            return encode(self.data.get(args[1]))
+        if name == "SET":
+            ttl = int(args[4]) if len(args) >= 5 and args[3].upper() == "EX" else None
+            self.data.set(args[1], args[2], ttl)
+            return b"+OK\r\n"
+        if name == "DEL":
+            existed = sum(self.data.get(k) is not None for k in args[1:])
+            for k in args[1:]:
+                self.data.delete(k)
+            return encode(existed)
+        if name == "INCR":
+            return encode(self.data.incr(args[1]))
+        if name == "INCRBY":
+            return encode(self.data.incr(args[1], amount=int(args[2])))
+        if name == "EXPIRE":
+            with self.lock:
+                value = self.data.get(args[1])
+                if value is None:
+                    return encode(0)
+                self.data.set(args[1], value, int(args[2]))
+            return encode(1)
+        if name == "DBSIZE":
+            return encode(len(self.data._data))
+        if name == "FLUSHDB":
+            self.data = MemoryBackend()
+            return b"+OK\r\n"
+        return f"-ERR unknown command '{args[0]}'\r\n".encode("utf-8")
+
+
+def make_handler(store):
+    class Handler(socketserver.StreamRequestHandler):
+        def read_command(self):
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if not line.startswith(b"*"):
+                return line.decode("utf-8").split()   # inline command, e.g. from telnet
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+            return args
+
+        def handle(self):
+            while True:
+                args = self.read_command()
+                if args is None:
+                    return
+                if args:
+                    self.wfile.write(store.run(args))
+
+    return Handler
+
+
+class Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve(port=6390, host="127.0.0.1"):
+    """Starts the server in a background thread. Returns it; call .shutdown() to stop."""
+    server = Server((host, port), make_handler(Store()))
+    threading.Thread(target=server.serve_forever, name="fake-redis", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    server = serve(args.port)
+    print(f"Fake Redis on redis://127.0.0.1:{args.port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Incremental parser for a JSON object that arrives in streamed chunks.
+
+Schema-constrained answers (one string per platform key) only parse with
+json.loads once the last byte is in. JsonObjectStream reads the chunks as
+they come and hands back each top-level member as soon as its value is
+complete, so a caller can show the first platform while the model is still
+writing the others. The full text should still go through json.loads at the
+end; this is for early display, not validation.
+"""
+import json
+
+WHITESPACE = " \t\r\n"
+
+
+class JsonObjectStream:
+    """stream = JsonObjectStream(); for key, value in stream.feed(chunk): ..."""
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0            # next character to scan
+        self._state = "start"    # start, key, colon, value, done
+        self._start = None       # where the current key or value began
+        self._key = None
+        self._in_string = False
+        self._escaped = False
+        self._depth = 0          # brackets open inside the current value
+        self.members = {}
+
+    def feed(self, chunk):
+        """Adds a chunk; returns the (key, value) pairs it completed, in order."""
+        self._text += chunk
+        completed = []
+        text = self._text
+        while self._pos < len(text) and self._state != "done":
+            char = text[self._pos]
+            if self._state == "start":
+                if char == "{":
+                    self._state = "key"
+            elif self._state == "key":
+                if self._start is None:
+                    if char == '"':
+                        self._start, self._in_string = self._pos, True
+                    elif char == "}":
+                        self._state = "done"
+                elif self._scan_string(char):
+                    self._key = json.loads(text[self._start:self._pos + 1])
+                    self._start, self._state = None, "colon"
+            elif self._state == "colon":
+                if char == ":":
+                    self._state = "value"
+            elif self._state == "value":
+                end = self._scan_value(char)
+                if end is not None:
+                    value = json.loads(text[self._start:end])
+                    self.members[self._key] = value
+                    completed.append((self._key, value))
+                    self._start, self._key, self._state = None, None, "key"
+                    if end == self._pos and char == "}":
+                        self._state = "done"
+            self._pos += 1
+        return completed
+
+    def _scan_string(self, char):
+        """Advances through a string body; True on its closing quote."""
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"':
+            self._in_string = False
+            return True
+        return False
+
+    def _scan_value(self, char):
+        """Advances through a value; returns its end index once it is complete."""
+        if self._start is None:
+            if char in WHITESPACE:
+                return None
+            self._start = self._pos
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth = 1
+            return None
+        if self._in_string:
+            if self._scan_string(char) and self._depth == 0:
+                return self._pos + 1
+            return None
+        if char == '"':
+            self._in_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            if self._depth == 0:
+                return self._pos   # '}' closing the object right after a number/true/false/null
+            self._depth -= 1
+            if self._depth == 0:
+                return self._pos + 1
+        elif self._depth == 0 and (char == "," or char in WHITESPACE):
+            return self._pos       # end of a number/true/false/null
+        return None
@@ -0,0 +1,281 @@
+"""Model backends behind llm_calls.generate_text, and the routing between them.
+
+Gemini is the default and, with nothing configured, the only backend. Set
+RIZEN_LOCAL_LLM_URL to any OpenAI-compatible server (llama.cpp's
+llama-server, vLLM, Ollama, LM Studio...) and it becomes a second backend:
+when Gemini throttles, errors or turns slow, calls go to the local server
+instead of failing or making users wait, and go back once Gemini recovers.
+
+Routing is per process, from what the calls themselves show:
+- a 429 puts a backend in cooldown right away;
+- FAILURES_TO_TRIP errors or slow calls in a row do the same. A call is slow
+  when it takes SLOW_FACTOR times the backend's usual latency for that stage;
+- backends in cooldown are only tried when no healthy one is left, and the
+  local server is skipped while its /models endpoint does not answer.
+
+OpenAICompatBackend talks plain HTTP with urllib, so no client library is
+needed.
+"""
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from google.genai import errors as genai_errors
+from google.genai import types
+
+# Local OpenAI-compatible server, e.g. http://127.0.0.1:8080/v1 for llama-server. Empty: Gemini only.
+LOCAL_LLM_URL = os.getenv("RIZEN_LOCAL_LLM_URL", "").rstrip("/")
+LOCAL_LLM_MODEL = os.getenv("RIZEN_LOCAL_LLM_MODEL", "local-model")
+LOCAL_LLM_API_KEY = os.getenv("RIZEN_LOCAL_LLM_API_KEY", "")
+LOCAL_TIMEOUT = float(os.getenv("RIZEN_LOCAL_LLM_TIMEOUT", "120"))   # seconds without a byte from the server
+
+# "gemini" or "local": which backend gets calls while both are healthy.
+LLM_PRIMARY = os.getenv("RIZEN_LLM_PRIMARY", "gemini")
+
+COOLDOWN = float(os.getenv("RIZEN_LLM_COOLDOWN", "30"))   # seconds a tripped backend is passed over
+FAILURES_TO_TRIP = 3
+SLOW_FACTOR = 2.0             # a call this many times the usual latency counts against the backend
+SLOW_MIN_SECONDS = 5.0        # ...but never one faster than this
+LATENCY_MIN_SAMPLES = 5       # calls per stage before latency is judged
+HEALTH_INTERVAL = 10.0        # seconds between probes of the local server
+HEALTH_TIMEOUT = 1.0
+
+FAILOVER_ENABLED = bool(LOCAL_LLM_URL)
+
+
+class BackendUnavailable(ConnectionError):
+    """The backend could not answer (down, throttled, timed out). The next backend is tried."""
+
+
+def is_failover_error(error):
+    """True for errors another backend might not have: throttling, server errors, network trouble."""
+    if isinstance(error, genai_errors.APIError):
+        return error.code in (408, 429) or (error.code or 0) >= 500
+    if isinstance(error, (BackendUnavailable, TimeoutError, ConnectionError)):
+        return True
+    # httpx (used by google-genai) network errors, without importing httpx here
+    return type(error).__module__.startswith("httpx") and "Error" in type(error).__name__
+
+
+def _usage(prompt_tokens, output_tokens):
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt_tokens, candidates_token_count=output_tokens, thoughts_token_count=0,
+    )
+
+
+# --- OPENAI-COMPATIBLE BACKEND ---
+
+def _json_schema(schema):
+    """Gemini response schema (dict or types.Schema) as JSON Schema (lower-case types)."""
+    if hasattr(schema, "model_dump"):
+        schema = schema.model_dump(exclude_none=True, mode="json")
+    if isinstance(schema, dict):
+        return {key: (value.lower() if key == "type" and isinstance(value, str) else _json_schema(value))
+                for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [_json_schema(item) for item in schema]
+    return schema
+
+
+class OpenAICompatBackend:
+    """Chat completions on an OpenAI-compatible server. Gemini model names are ignored."""
+
+    def __init__(self, base_url, model, api_key="", timeout=LOCAL_TIMEOUT):
+        self.name = "local"
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self._checked_at = 0.0
+        self._up = True
+
+    def ready(self):
+        """Whether /models answered on the last probe (probed at most every HEALTH_INTERVAL)."""
+        now = time.monotonic()
+        if now - self._checked_at >= HEALTH_INTERVAL:
+            self._checked_at = now
+            try:
+                with urllib.request.urlopen(self._request("/models"), timeout=HEALTH_TIMEOUT) as response:
+                    self._up = response.status == 200
+            except (OSError, ValueError):
+                self._up = False
+        return self._up
+
+    def _request(self, path, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        return urllib.request.Request(self.base_url + path, data=data, headers=headers)
+
+    def _body(self, contents, config, stream):
+        parts = [contents] if isinstance(contents, str) else list(contents)
+        messages = []
+        if config is not None and config.system_instruction:
+            messages.append({"role": "system", "content": str(config.system_instruction)})
+        messages.append({"role": "user", "content": "\n\n".join(str(part) for part in parts)})
+        body = {"model": self.model, "messages": messages, "stream": stream}
+        if config is not None:
+            if config.temperature is not None:
+                body["temperature"] = config.temperature
+            if config.max_output_tokens:
+                body["max_tokens"] = config.max_output_tokens
+            if config.response_mime_type == "application/json":
+                if config.response_schema is not None:
+                    body["response_format"] = {"type": "json_schema", "json_schema": {
+                        "name": "response", "schema": _json_schema(config.response_schema)}}
+                else:
+                    body["response_format"] = {"type": "json_object"}
+        if stream:
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    def _open(self, body):
+        try:
+            return urllib.request.urlopen(self._request("/chat/completions", body), timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            # Any refusal is worth retrying upstream: the local server may not support a feature (e.g. json_schema)
+            raise BackendUnavailable(f"local model server returned {e.code}: {e.read()[:200]!r}") from e
+        except OSError as e:
+            raise BackendUnavailable(f"local model server unreachable: {e}") from e
+
+    def generate(self, stage, model, contents, config, on_text=None):
+        """Returns (text, usage metadata, model name for the ledger)."""
+        if on_text is None:
+            with self._open(self._body(contents, config, stream=False)) as response:
+                payload = json.load(response)
+            usage = payload.get("usage") or {}
+            text = payload["choices"][0]["message"].get("content") or ""
+            return text, _usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)), self.ledger_model
+
+        parts, usage = [], {}
+        with self._open(self._body(contents, config, stream=True)) as response:
+            try:
+                for line in response:
+                    line = line.strip()
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or usage
+                    for choice in chunk.get("choices") or ():
+                        text = (choice.get("delta") or {}).get("content")
+                        if text:
+                            parts.append(text)
+                            on_text(text)
+            except OSError as e:
+                raise BackendUnavailable(f"local model stream broke off: {e}") from e
+        return "".join(parts), _usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)), self.ledger_model
+
+    @property
+    def ledger_model(self):
+        return f"local/{self.model}"
+
+
+_local_backend = None
+_local_lock = threading.Lock()
+
+
+def get_local_backend():
+    """The configured local backend, or None when RIZEN_LOCAL_LLM_URL is not set."""
+    global _local_backend
+    if not LOCAL_LLM_URL:
+        return None
+    with _local_lock:
+        if _local_backend is None:
+            _local_backend = OpenAICompatBackend(LOCAL_LLM_URL, LOCAL_LLM_MODEL, LOCAL_LLM_API_KEY)
+        return _local_backend
+
+
+# --- ROUTING ---
+
+class Router:
+    """Tracks errors and latency per backend and decides the order to try them in."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._health = {}   # backend name -> state
+
+    def _state(self, name):
+        return self._health.setdefault(name, {
+            "strikes": 0, "down_until": 0.0, "calls": 0, "failures": 0, "slow_calls": 0, "trips": 0,
+            "latency": {},   # stage -> [samples, recent average, usual average]
+        })
+
+    def order(self, backends):
+        """Healthy backends in the given order, then those in cooldown, soonest back first."""
+        now = time.monotonic()
+        with self._lock:
+            down_until = {backend.name: self._state(backend.name)["down_until"] for backend in backends}
+        healthy = [backend for backend in backends if down_until[backend.name] <= now]
+        cooling = sorted((backend for backend in backends if down_until[backend.name] > now),
+                         key=lambda backend: down_until[backend.name])
+        return healthy + cooling
+
+    def _strike(self, state):
+        state["strikes"] += 1
+        if state["strikes"] >= FAILURES_TO_TRIP:
+            self._trip(state)
+
+    def _trip(self, state):
+        state["strikes"] = 0
+        state["down_until"] = time.monotonic() + COOLDOWN
+        state["trips"] += 1
+
+    def success(self, name, stage, seconds):
+        with self._lock:
+            state = self._state(name)
+            state["calls"] += 1
+            samples = state["latency"].setdefault(stage, [0, seconds, seconds])
+            slow = samples[0] >= LATENCY_MIN_SAMPLES and seconds > max(SLOW_MIN_SECONDS, SLOW_FACTOR * samples[2])
+            samples[0] += 1
+            samples[1] = 0.7 * samples[1] + 0.3 * seconds
+            samples[2] = 0.95 * samples[2] + 0.05 * seconds
+            if slow:
+                state["slow_calls"] += 1
+                self._strike(state)
+            else:
+                state["strikes"] = 0
+                state["down_until"] = 0.0
+
+    def failure(self, name, error):
+        with self._lock:
+            state = self._state(name)
+            state["calls"] += 1
+            state["failures"] += 1
+            if isinstance(error, genai_errors.APIError) and error.code == 429:
+                self._trip(state)   # throttled: don't keep knocking
+            else:
+                self._strike(state)
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            snapshot = {}
+            for name, state in self._health.items():
+                snapshot[name] = {
+                    key: value for key, value in state.items() if key not in ("latency", "down_until", "strikes")
+                }
+                snapshot[name]["cooldown_s"] = round(max(0.0, state["down_until"] - now), 1)
+                snapshot[name]["latency_s"] = {
+                    stage: {"recent": round(recent, 2), "usual": round(usual, 2)}
+                    for stage, (_, recent, usual) in state["latency"].items()
+                }
+            return snapshot
+
+
+router = Router()
+
+
+def backend_status():
+    """Per-backend calls, failures, cooldown and latency, for the metrics expanders."""
+    status = router.status()
+    local = get_local_backend()
+    if local is not None:
+        status.setdefault("local", {})["reachable"] = local.ready()
+    return status
@@ -0,0 +1,308 @@
+"""Shared Gemini call layer for the RizenAi apps.
+
+The Streamlit scripts re-run top to bottom on every interaction, but modules
+they import are loaded once per server process. Anything in here (latency
+history, budgets, metrics) is therefore shared by every session.
+
+generate_text goes through the backends in llm_backends.py: Gemini, plus a
+local OpenAI-compatible server to fail over to when one is configured.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from google import genai
+from google.genai import types
+
+import usage_ledger
+from llm_backends import LLM_PRIMARY, get_local_backend, is_failover_error, router
+from state_backend import StateBackendError, get_backend, key as state_key
+
+# --- HEDGING CONFIG ---
+HEDGING_ENABLED = os.getenv("RIZEN_HEDGING", "0") == "1"
+HEDGE_BUDGET_PER_MINUTE = int(os.getenv("RIZEN_HEDGE_BUDGET", "10"))
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 20        # below this we use the default delay
+HEDGE_DEFAULT_DELAY = 8.0     # seconds to first token before hedging
+HEDGE_MIN_DELAY = 1.0         # never hedge faster than this
+LATENCY_WINDOW = 200          # first-token samples kept per stage
+
+# Show the call metrics expander even when hedging is off.
+SHOW_METRICS = os.getenv("RIZEN_SHOW_METRICS", "0") == "1"
+
+# Send Gemini requests somewhere else, e.g. the local stand-in in fake_gemini_server.py.
+GEMINI_BASE_URL = os.getenv("RIZEN_GEMINI_BASE_URL", "")
+
+_hedge_loop = None           # event loop that runs every hedged attempt (see _attempt_loop)
+_lock = threading.Lock()
+_first_token_latency = {}     # stage -> deque of seconds
+_metrics = {}                 # stage -> counters
+_usage_local = threading.local()
+
+
+# --- METRICS ---
+
+def _stage_metrics(stage):
+    return _metrics.setdefault(stage, {"calls": 0, "hedges_fired": 0, "hedge_wins": 0, "budget_denied": 0, "failovers": 0})
+
+
+def _bump(stage, counter):
+    with _lock:
+        _stage_metrics(stage)[counter] += 1
+
+
+def _record_first_token(stage, seconds):
+    with _lock:
+        samples = _first_token_latency.setdefault(stage, deque(maxlen=LATENCY_WINDOW))
+        samples.append(seconds)
+
+
+def hedge_threshold(stage):
+    """Seconds to wait for a first token before firing a duplicate call."""
+    with _lock:
+        samples = sorted(_first_token_latency.get(stage, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    index = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))
+    return max(HEDGE_MIN_DELAY, samples[index])
+
+
+def hedge_metrics():
+    """Per-stage call, hedge and win counts plus the current threshold."""
+    with _lock:
+        snapshot = {stage: dict(counters) for stage, counters in _metrics.items()}
+    for stage, counters in snapshot.items():
+        fired = counters["hedges_fired"]
+        counters["hedge_win_rate"] = round(counters["hedge_wins"] / fired, 3) if fired else 0.0
+        counters["threshold_s"] = round(hedge_threshold(stage), 2)
+    return snapshot
+
+
+def _take_hedge_budget():
+    """Spends one hedge from this minute's budget, if any is left.
+
+    The counter lives in the state backend, so with a shared backend the
+    budget holds across all replicas. If the backend is down, nothing hedges.
+    """
+    minute = int(time.time() // 60)
+    try:
+        spent = get_backend().incr(state_key("hedge_budget", minute), ttl=120)
+    except StateBackendError:
+        return False
+    return spent <= HEDGE_BUDGET_PER_MINUTE
+
+
+# --- USAGE TRACKING ---
+
+@contextmanager
+def track_usage():
+    """Collects token usage of every call made by this thread inside the block."""
+    previous = getattr(_usage_local, "records", None)
+    records = _usage_local.records = []
+    try:
+        yield records
+    finally:
+        _usage_local.records = previous
+
+
+def _record_usage(stage, model, usage_metadata):
+    """Writes the call to the usage ledger and to any track_usage() block of this thread."""
+    if usage_metadata is None:
+        return
+    record = {
+        "stage": stage,
+        "prompt_tokens": usage_metadata.prompt_token_count or 0,
+        "output_tokens": usage_metadata.candidates_token_count or 0,
+        "thinking_tokens": usage_metadata.thoughts_token_count or 0,
+    }
+    usage_ledger.record(stage, model, record["prompt_tokens"], record["output_tokens"], record["thinking_tokens"])
+    records = getattr(_usage_local, "records", None)
+    if records is not None:
+        records.append(record)
+
+
+# --- CLIENT ---
+
+def make_client(api_key):
+    """Gemini client, pointed at RIZEN_GEMINI_BASE_URL when set."""
+    if GEMINI_BASE_URL:
+        return genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=GEMINI_BASE_URL))
+    return genai.Client(api_key=api_key)
+
+
+# --- CALLS ---
+
+def _attempt_loop():
+    """One background event loop for all hedged attempts.
+
+    Attempts are tasks, not pool workers: they never queue behind each other,
+    and cancelling a task closes its HTTP stream right away, even while it is
+    still waiting for the first token.
+    """
+    global _hedge_loop
+    with _lock:
+        if _hedge_loop is None:
+            _hedge_loop = asyncio.new_event_loop()
+            threading.Thread(target=_hedge_loop.run_forever, name="gemini-hedge", daemon=True).start()
+        return _hedge_loop
+
+
+async def _stream_attempt(client, attempt, model, contents, config, events):
+    """Runs one streaming call, reporting 'first', 'done' or 'error' events."""
+    start = time.monotonic()
+    stream = None
+    try:
+        stream = await client.aio.models.generate_content_stream(model=model, contents=contents, config=config)
+        parts = []
+        usage = None
+        async for chunk in stream:
+            if not parts:
+                events.put(("first", attempt, time.monotonic() - start))
+            parts.append(chunk.text or "")
+            usage = chunk.usage_metadata or usage
+        if not parts:
+            events.put(("first", attempt, time.monotonic() - start))
+        events.put(("done", attempt, ("".join(parts), usage)))
+    except Exception as e:
+        events.put(("error", attempt, e))
+    finally:
+        if stream is not None:
+            await stream.aclose()   # releases the connection when this attempt is cancelled
+
+
+def _start_attempt(client, attempt, model, contents, config, events):
+    return asyncio.run_coroutine_threadsafe(
+        _stream_attempt(client, attempt, model, contents, config, events), _attempt_loop()
+    )
+
+
+def _hedged_call(client, stage, model, contents, config):
+    events = queue.Queue()
+    attempts = [_start_attempt(client, 0, model, contents, config, events)]
+
+    winner = None
+    errors = {}
+    can_hedge = True
+    deadline = time.monotonic() + hedge_threshold(stage)
+    try:
+        while True:
+            timeout = None
+            if can_hedge and winner is None:
+                timeout = max(0.0, deadline - time.monotonic())
+            try:
+                kind, attempt, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                # Primary is past the threshold with no first token: hedge once.
+                can_hedge = False
+                if _take_hedge_budget():
+                    _bump(stage, "hedges_fired")
+                    attempts.append(_start_attempt(client, 1, model, contents, config, events))
+                else:
+                    _bump(stage, "budget_denied")
+                continue
+
+            if kind == "first" and winner is None:
+                winner = attempt
+                _record_first_token(stage, payload)
+                for i, other in enumerate(attempts):
+                    if i != winner:
+                        other.cancel()
+                if winner == 1:
+                    _bump(stage, "hedge_wins")
+            elif kind == "done" and attempt == winner:
+                return payload
+            elif kind == "error":
+                errors[attempt] = payload
+                if attempt == winner or len(errors) == len(attempts):
+                    raise payload
+    finally:
+        for other in attempts:
+            other.cancel()   # no-op for finished attempts
+
+
+def _streamed_call(client, model, contents, config, on_text):
+    """Streams in the calling thread, handing each chunk to on_text as it arrives."""
+    parts = []
+    usage = None
+    for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+        if chunk.text:
+            parts.append(chunk.text)
+            on_text(chunk.text)
+        usage = chunk.usage_metadata or usage
+    return "".join(parts), usage
+
+
+class GeminiBackend:
+    """Gemini through the given client, with hedging when it is enabled."""
+
+    name = "gemini"
+
+    def __init__(self, client):
+        self.client = client
+
+    def ready(self):
+        return True   # no cheap probe; health comes from the calls themselves
+
+    def generate(self, stage, model, contents, config, on_text=None):
+        """Returns (text, usage metadata, model name for the ledger)."""
+        if on_text is not None:
+            text, usage = _streamed_call(self.client, model, contents, config, on_text)
+        elif not HEDGING_ENABLED:
+            response = self.client.models.generate_content(model=model, contents=contents, config=config)
+            text, usage = response.text, response.usage_metadata
+        else:
+            text, usage = _hedged_call(self.client, stage, model, contents, config)
+        return text, usage, model
+
+
+def _backends(client):
+    gemini = GeminiBackend(client)
+    local = get_local_backend()
+    if local is None:
+        return [gemini]
+    return [local, gemini] if LLM_PRIMARY == "local" else [gemini, local]
+
+
+def generate_text(client, stage, model, contents, config, on_text=None):
+    """Calls generate_content and returns the response text.
+
+    With on_text the call is streamed and every chunk is passed to on_text
+    (for live display) before the full text is returned. Otherwise, with
+    hedging enabled the call is streamed; if no first token arrives within
+    the stage's adaptive threshold a duplicate is fired and the first to answer
+    wins, the other is cancelled.
+
+    With a local backend configured, a call that fails with a throttling,
+    server or network error is retried on the next backend, unless text was
+    already streamed to on_text.
+    """
+    usage_ledger.check_budget()  # raises BudgetExceeded before anything is sent
+    _bump(stage, "calls")
+    streamed = []
+    if on_text is not None:
+        def on_text(chunk, _forward=on_text):
+            streamed.append(chunk)
+            _forward(chunk)
+    candidates = router.order(_backends(client))
+    for i, backend in enumerate(candidates):
+        last = i == len(candidates) - 1
+        if not last and not backend.ready():
+            continue
+        start = time.monotonic()
+        try:
+            text, usage, used_model = backend.generate(stage, model, contents, config, on_text)
+        except Exception as e:
+            if not is_failover_error(e):
+                raise
+            router.failure(backend.name, e)
+            if last or streamed:
+                raise
+            _bump(stage, "failovers")
+            continue
+        router.success(backend.name, stage, time.monotonic() - start)
+        _record_usage(stage, used_model, usage)
+        return text
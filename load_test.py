@@ -0,0 +1,259 @@
+"""Load generator for the 7-day app against the local fake Gemini server.
+
+Starts `streamlit run Rizen_7Day_System.py` and fake_gemini_server.py as
+subprocesses, then drives N concurrent sessions through the full screen flow
+(welcome -> profile -> Path B topic options -> lock in -> 7-day plan). Each
+session talks to the server over its websocket protocol the same way a
+browser tab does: it sends widget states and reads back the rendered
+elements. Thread counts and RSS are sampled from the Streamlit server process
+(Linux /proc); the fake server reports how many LLM calls were in flight.
+
+Usage:
+    python load_test.py --sessions 1 5 10 25 50 --latency 2.0 --jitter 0.5
+    python load_test.py --sessions 10 --throttle 0.5 --local-failover   # half of Gemini calls get 429
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, "Rizen_7Day_System.py")
+SAMPLE_INTERVAL = 0.2  # seconds between thread/RSS samples
+
+
+# --- PROCESSES ---
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited with code {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+def start_fake_server(port, latency, jitter, plan_words, throttle=0.0):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "fake_gemini_server.py"), "--port", str(port), "--latency", str(latency),
+         "--jitter", str(jitter), "--plan-words", str(plan_words), "--throttle", str(throttle)],
+        stdout=subprocess.DEVNULL,
+    )
+    wait_for_port(port, process)
+    return process
+
+
+def start_app(port, llm_url, secrets_path, local_failover=False):
+    env = dict(os.environ, RIZEN_GEMINI_BASE_URL=llm_url)
+    if local_failover:
+        env["RIZEN_LOCAL_LLM_URL"] = f"{llm_url}/v1"  # the fake server is also the "local" backend
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.port", str(port),
+         "--server.headless", "true", "--browser.gatherUsageStats", "false",
+         "--server.fileWatcherType", "none", "--secrets.files", secrets_path],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_for_port(port, process)
+    return process
+
+
+def process_status(pid):
+    """(threads, RSS in MB) of a process, from /proc. (None, None) where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Threads"]), int(fields["VmRSS"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def llm_stats(llm_url, reset=False):
+    try:
+        with urllib.request.urlopen(f"{llm_url}/stats{'?reset' if reset else ''}", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return {}
+
+
+# --- ONE SIMULATED BROWSER SESSION ---
+
+class Session:
+    """Minimal websocket client for one Streamlit session: rerun, read elements, click."""
+
+    def __init__(self, ws, timeout):
+        self.ws = ws
+        self.timeout = timeout
+        self.elements = []
+
+    async def rerun(self, widget_states=()):
+        """Sends a rerun and waits for a run that finishes normally (st.rerun chains are followed)."""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        for state in widget_states:
+            message.rerun_script.widget_states.widgets.append(state)
+        await self.ws.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.elements = []
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                self.elements.append((element.WhichOneof("type"), element))
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("script failed to compile")
+                if forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self.check_errors()
+                    return
+
+    def check_errors(self):
+        for kind, element in self.elements:
+            if kind == "exception":
+                raise RuntimeError(f"exception: {element.exception.message}")
+            if kind == "alert" and element.alert.format == Alert.ERROR:
+                raise RuntimeError(f"error: {element.alert.body}")
+
+    def widget(self, kind, label):
+        for element_kind, element in self.elements:
+            if element_kind == kind and getattr(element, kind).label.startswith(label):
+                return getattr(element, kind)
+        raise RuntimeError(f"no {kind} '{label}' on screen: {[k for k, _ in self.elements]}")
+
+    async def click(self, label, text_inputs=None):
+        states = []
+        for input_label, value in (text_inputs or {}).items():
+            state = states_entry(self.widget("text_input", input_label).id)
+            state.string_value = value
+            states.append(state)
+        trigger = states_entry(self.widget("button", label).id)
+        trigger.trigger_value = True
+        states.append(trigger)
+        await self.rerun(states)
+
+
+def states_entry(widget_id):
+    state = BackMsg().rerun_script.widget_states.widgets.add()
+    state.id = widget_id
+    return state
+
+
+async def run_session(app_url, index, shared_profile, timeout):
+    """One full pass through the screens. Returns seconds taken; raises if the flow did not finish."""
+    started = time.monotonic()
+    async with websockets.connect(app_url, subprotocols=["streamlit"], max_size=None, open_timeout=timeout) as ws:
+        session = Session(ws, timeout)
+        await session.rerun()
+        await session.click("Start My 7-Day Journey")
+        # Distinct profiles by default, so coalescing and caches don't hide the load
+        suffix = "" if shared_profile else f" #{index}"
+        await session.click("Path B", {
+            "1. My Niche": f"Digital Marketing for Solopreneurs{suffix}",
+            "2. Who do I want to reach": f"Women restarting careers{suffix}",
+        })
+        await session.click("Lock in Strategy")
+        session.widget("button", "👇 Generate Next Day")  # only on the result screen
+    return time.monotonic() - started
+
+
+async def run_level(app_url, app_pid, sessions, shared_profile, timeout):
+    """Starts `sessions` flows at once; returns latencies, failures, wall time and peak samples."""
+    peak = {"threads": 0, "rss_mb": 0.0}
+
+    async def sample():
+        while True:
+            threads, rss = process_status(app_pid)
+            if threads is not None:
+                peak["threads"] = max(peak["threads"], threads)
+                peak["rss_mb"] = max(peak["rss_mb"], rss)
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    sampler = asyncio.create_task(sample())
+    started = time.monotonic()
+    results = await asyncio.gather(
+        *(run_session(app_url, i, shared_profile, timeout) for i in range(sessions)), return_exceptions=True
+    )
+    wall = time.monotonic() - started
+    sampler.cancel()
+    latencies = [r for r in results if not isinstance(r, BaseException)]
+    failures = [repr(r) for r in results if isinstance(r, BaseException)]
+    return {"latencies": latencies, "failures": failures, "wall": wall, **peak}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def run(args, app_url, app_pid, llm_url):
+    await run_session(app_url, -1, True, args.timeout)  # warm-up: imports, Lottie files, cache_resource objects
+    threads, rss = process_status(app_pid)
+    print(f"baseline: {threads} threads, {rss or 0:.0f} MB RSS")
+    print(f"{'sessions':>8} {'ok':>4} {'fail':>5} {'flows/min':>10} {'p50 s':>7} {'p95 s':>7} "
+          f"{'peak threads':>13} {'peak RSS MB':>12} {'LLM calls':>10} {'peak in flight':>15} {'local':>6} {'429s':>5}")
+    for n in args.sessions:
+        llm_stats(llm_url, reset=True)
+        level = await run_level(app_url, app_pid, n, args.shared_profile, args.timeout)
+        calls = llm_stats(llm_url)
+        latencies = level["latencies"]
+        print(f"{n:>8} {len(latencies):>4} {len(level['failures']):>5} "
+              f"{len(latencies) / level['wall'] * 60:>10.1f} "
+              f"{statistics.median(latencies) if latencies else 0:>7.2f} {percentile(latencies, 0.95):>7.2f} "
+              f"{level['threads']:>13} {level['rss_mb']:>12.0f} "
+              f"{calls.get('requests', '-'):>10} {calls.get('peak_in_flight', '-'):>15} "
+              f"{calls.get('chat_requests', '-'):>6} {calls.get('throttled', '-'):>5}")
+        for failure in level["failures"][:3]:
+            print(f"         failure: {failure[:200]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--latency", type=float, default=2.0, help="fake server seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--plan-words", type=int, default=2800)
+    parser.add_argument("--app-port", type=int, default=8599)
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--shared-profile", action="store_true",
+                        help="every session submits the same profile (workshop case)")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for any one screen")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of Gemini calls the fake server answers with 429")
+    parser.add_argument("--local-failover", action="store_true",
+                        help="also use the fake server as the local OpenAI-compatible backend")
+    args = parser.parse_args()
+
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    processes = []
+    with tempfile.TemporaryDirectory() as directory:
+        secrets_path = os.path.join(directory, "secrets.toml")
+        with open(secrets_path, "w") as f:
+            f.write('GEMINI_API_KEY = "load-test"\n')
+        try:
+            processes.append(start_fake_server(args.llm_port, args.latency, args.jitter, args.plan_words, args.throttle))
+            app = start_app(args.app_port, llm_url, secrets_path, args.local_failover)
+            processes.append(app)
+            asyncio.run(run(args, f"ws://127.0.0.1:{args.app_port}/_stcore/stream", app.pid, llm_url))
+        finally:
+            for process in processes:
+                process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Finds the day sections of a 7-day plan.
+
+The prompt asks for '--- DAY [Number] ---' lines, but the model also writes
+'---DAY 2---', '--- DAY 1: Monday ---' or '-- Day 3 --'. The app's day
+slices, the exports and the platform-rule pass all split on this one
+definition, so they always agree on where each day starts.
+"""
+import re
+
+# A line of two or more dashes, then DAY and its number; anything after the number (a weekday, dashes) is allowed.
+DAY_DELIMITER = re.compile(r"^[ \t]*-{2,}[ \t]*DAY[ \t]*\[?(\d+)\]?[^\n]*$", re.IGNORECASE | re.MULTILINE)
+
+
+def is_day_delimiter(line):
+    return DAY_DELIMITER.match(line) is not None
+
+
+def day_spans(text):
+    """Character spans of the intro and of each day's body: ((start, end), [(day_number, (start, end)), ...]).
+
+    A day's body starts on the line after its delimiter and ends where the
+    next delimiter begins.
+    """
+    matches = list(DAY_DELIMITER.finditer(text))
+    if not matches:
+        return (0, len(text)), []
+    days = []
+    for i, match in enumerate(matches):
+        body_start = min(match.end() + 1, len(text))   # skip the delimiter's newline
+        body_end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        days.append((int(match.group(1)), (body_start, body_end)))
+    return (0, matches[0].start()), days
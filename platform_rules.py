@@ -0,0 +1,283 @@
+"""Local platform-constraint validator and fixer for generated posts.
+
+Runs in milliseconds on the model output: one precompiled regex finds every
+banned cliche, length and hashtag rules are checked per platform section.
+Deterministic problems (over-long tweets, too many hashtags) are fixed here;
+only sections that are still broken are sent back to the model.
+"""
+import json
+import re
+
+from google.genai import types
+
+from llm_calls import generate_text
+from plan_days import is_day_delimiter
+
+# --- RULES ---
+
+# From the writer rules in generate_7_day_plan: "No AI cliches".
+BANNED_PHRASES = ["unlock", "unleash", "in today's world", "deep dive"]
+
+PLATFORM_RULES = {
+    "twitter": {"max_chars": 280, "max_hashtags": 2, "thread": True},
+    "linkedin": {"max_chars": 3000, "max_hashtags": 5},
+    "instagram": {"max_chars": 2200, "max_hashtags": 10},
+    "facebook": {"max_hashtags": 3},
+}
+
+TWEET_LIMIT = PLATFORM_RULES["twitter"]["max_chars"]
+
+# One alternation for all phrases, so a section is scanned once however long the list gets.
+# "unlock" also matches "unlocks"/"unlocking"; the apostrophe accepts straight or curly quotes.
+_BANNED = re.compile(
+    r"\b(?:" + "|".join(re.escape(p).replace("'", "['’]").replace(r"\ ", r"[\s-]+") for p in BANNED_PHRASES) + r")\w*",
+    re.IGNORECASE,
+)
+_PLATFORM = re.compile(r"\b(twitter|x thread|linkedin|instagram|facebook|blog|email|newsletter|youtube)\b", re.IGNORECASE)
+_PLATFORM_FAMILY = {"x thread": "twitter", "newsletter": "email"}
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s")
+_HASHTAG = re.compile(r"(?<![\w#])#[A-Za-z]\w*")
+_TWEET_NUMBER = re.compile(r"^\s*(\d{1,2})\s*[/.)]\s*")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def platform_family(name):
+    """'Twitter/X Thread' -> 'twitter', 'Email Newsletter' -> 'email'; None if unknown."""
+    match = _PLATFORM.search(name or "")
+    if not match:
+        return None
+    word = match.group(1).lower()
+    return _PLATFORM_FAMILY.get(word, word)
+
+
+# --- SECTIONING ---
+
+def _is_heading(line):
+    """Markdown headings, and short label lines naming a platform ('[Twitter]', '**Instagram:**', 'LinkedIn Post:').
+
+    Other labels ('1/ Here's why:', '**Hook:**') and hashtag lines are post text.
+    """
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80:
+        return False
+    if _MARKDOWN_HEADING.match(stripped):
+        return True
+    label = stripped.startswith(("**", "[", "__")) or stripped.rstrip("*_").endswith(":")
+    return label and len(stripped.split()) <= 6 and platform_family(stripped) is not None
+
+
+def split_sections(text, platforms_only=False):
+    """Finds platform sections in free-form output.
+
+    A section starts at a short heading/label line naming a platform ('## LinkedIn Post',
+    '[Twitter]', '**Instagram:**') and ends at the next markdown heading, platform label
+    or '--- DAY' delimiter. With platforms_only, markdown headings that name no platform
+    stay inside the section (a post's own subheadings).
+    Returns dicts with platform family, character span (of the body and, as heading_start,
+    of the heading line) and body text.
+    """
+    sections = []
+    current = None
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        heading = _is_heading(line) and (not platforms_only or platform_family(line) is not None)
+        if is_day_delimiter(line) or heading:
+            if current:
+                current["end"] = offset
+                sections.append(current)
+                current = None
+            family = None if is_day_delimiter(line) else platform_family(line)
+            if family:
+                current = {"platform": family, "heading": line.strip(), "heading_start": offset, "start": offset + len(line)}
+        offset += len(line)
+    if current:
+        current["end"] = offset
+        sections.append(current)
+    for section in sections:
+        section["text"] = text[section["start"]:section["end"]]
+    return sections
+
+
+# --- DETERMINISTIC FIXES ---
+
+def trim_hashtags(body, limit):
+    """Keeps the first `limit` hashtags and drops the rest."""
+    seen = 0
+
+    def keep_or_drop(match):
+        nonlocal seen
+        seen += 1
+        return match.group(0) if seen <= limit else ""
+
+    trimmed = _HASHTAG.sub(keep_or_drop, body)
+    trimmed = re.sub(r"[ \t]{2,}", " ", trimmed)
+    return re.sub(r"[ \t]+$", "", trimmed, flags=re.MULTILINE)
+
+
+def _tweets(body):
+    """Splits a Twitter section into tweets: numbered items if it is a thread, else one tweet."""
+    lines = body.strip().splitlines()
+    if not any(_TWEET_NUMBER.match(line) for line in lines):
+        return [body.strip()]
+    tweets = []
+    for line in lines:
+        if _TWEET_NUMBER.match(line):
+            tweets.append(_TWEET_NUMBER.sub("", line, count=1))
+        elif tweets:
+            tweets[-1] += "\n" + line
+        elif line.strip():
+            tweets.append(line)  # lead-in line before "1/"
+    return [t.strip() for t in tweets if t.strip()]
+
+
+def _pack(text, limit):
+    """Greedily packs sentences (then words) into chunks no longer than limit."""
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        if len(sentence) <= limit:
+            pieces.append(sentence)
+        else:
+            pieces.extend(sentence.split(" "))
+    chunks = [""]
+    for piece in pieces:
+        candidate = f"{chunks[-1]} {piece}".strip() if chunks[-1] else piece
+        if len(candidate) <= limit:
+            chunks[-1] = candidate
+        else:
+            chunks.append(piece[:limit])
+    return [c for c in chunks if c]
+
+
+def split_thread(body):
+    """Re-flows a Twitter section so every tweet fits, numbered '1/', '2/'..."""
+    tweets = _tweets(body)
+    if all(len(t) <= TWEET_LIMIT for t in tweets):
+        return body
+    limit = TWEET_LIMIT - len("99/ ")
+    flowed = []
+    for tweet in tweets:
+        flowed.extend(_pack(tweet, limit) if len(tweet) > limit else [tweet])
+    leading = body[:len(body) - len(body.lstrip())]
+    return leading + "\n\n".join(f"{i}/ {t}" for i, t in enumerate(flowed, 1)) + "\n\n"
+
+
+# --- VALIDATION ---
+
+def check_section(platform, body):
+    """Returns a list of rule violations for one section."""
+    rules = PLATFORM_RULES.get(platform, {})
+    issues = []
+    banned = sorted({m.group(0) for m in _BANNED.finditer(body)})
+    if banned:
+        issues.append("banned cliches: " + ", ".join(banned))
+    if "max_hashtags" in rules and len(_HASHTAG.findall(body)) > rules["max_hashtags"]:
+        issues.append(f"more than {rules['max_hashtags']} hashtags")
+    if rules.get("thread"):
+        if any(len(t) > TWEET_LIMIT for t in _tweets(body)):
+            issues.append(f"tweet over {TWEET_LIMIT} characters")
+    elif "max_chars" in rules and len(body.strip()) > rules["max_chars"]:
+        issues.append(f"over {rules['max_chars']} characters")
+    return issues
+
+
+def fix_section(platform, body):
+    """Applies the deterministic fixes. Returns (new_body, list of fixes applied)."""
+    rules = PLATFORM_RULES.get(platform, {})
+    fixes = []
+    if "max_hashtags" in rules and len(_HASHTAG.findall(body)) > rules["max_hashtags"]:
+        body = trim_hashtags(body, rules["max_hashtags"])
+        fixes.append("hashtags trimmed")
+    if rules.get("thread") and any(len(t) > TWEET_LIMIT for t in _tweets(body)):
+        body = split_thread(body)
+        fixes.append("thread split")
+    return body, fixes
+
+
+# --- MODEL REPAIR (only for what is still broken) ---
+
+def repair_sections(client, broken):
+    """One call that rewrites only the broken sections. Returns new bodies in the same order."""
+    system_instruction = (
+        "You are a meticulous social media editor. Rewrite each post so it fixes the listed problems. "
+        "Keep the meaning, voice, CTA and formatting. Never use: " + ", ".join(f"'{p}'" for p in BANNED_PHRASES) + ". "
+        "Return a JSON array with exactly one rewritten post per input, in the same order."
+    )
+    prompt = "\n\n".join(
+        f"POST {i} ({section['platform']}) - problems: {'; '.join(section['issues'])}\n{section['text'].strip()}"
+        for i, section in enumerate(broken, 1)
+    )
+    response_text = generate_text(
+        client, "repair", model='gemini-2.5-flash', contents=prompt,
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction, temperature=0.4,
+            response_mime_type="application/json",
+            response_schema={"type": "array", "items": {"type": "string"}},
+        )
+    )
+    rewritten = json.loads(response_text)
+    if len(rewritten) != len(broken):
+        raise ValueError("repair returned a different number of posts")
+    return rewritten
+
+
+def _polish_bodies(sections, client):
+    """Fixes every section in place (adds 'issues'/'fixes'/'repaired'); returns the report."""
+    for section in sections:
+        section["text"], section["fixes"] = fix_section(section["platform"], section["text"])
+        section["issues"] = check_section(section["platform"], section["text"])
+        section["repaired"] = False
+
+    broken = [s for s in sections if s["issues"]]
+    if broken and client is not None:
+        try:
+            rewritten = repair_sections(client, broken)
+        except Exception:
+            rewritten = None  # keep the locally fixed text; the issues stay in the report
+        for section, new_body in zip(broken, rewritten or []):
+            new_body, more_fixes = fix_section(section["platform"], "\n" + new_body.strip() + "\n\n")
+            section["text"] = new_body
+            section["fixes"] += more_fixes
+            section["issues"] = check_section(section["platform"], new_body)
+            section["repaired"] = True
+    return [
+        {"platform": s["platform"], "fixes": s["fixes"], "issues": s["issues"], "repaired": s["repaired"]}
+        for s in sections
+    ]
+
+
+def polish_text(text, client=None):
+    """Validates and fixes free-form output (7-day plan, Chef deliverables).
+
+    Returns (text, report). Pass client=None to skip the model repair step.
+    """
+    sections = split_sections(text)
+    report = _polish_bodies(sections, client)
+    for section in reversed(sections):
+        text = text[:section["start"]] + section["text"] + text[section["end"]:]
+    return text, report
+
+
+def polish_results(results, client=None):
+    """Same as polish_text for the JSON output of the fused call: {platform_key: content}."""
+    sections = [
+        {"platform": platform_family(key.replace('_', ' ')), "key": key, "text": str(content)}
+        for key, content in results.items()
+    ]
+    report = _polish_bodies([s for s in sections if s["platform"]], client)
+    return {s["key"]: s["text"].strip() for s in sections}, report
+
+
+def summarize(report):
+    """One line for the UI, e.g. 'Auto-fixed 2 sections (thread split); 1 rewritten by the editor.'"""
+    fixed = [r for r in report if r["fixes"]]
+    repaired = [r for r in report if r["repaired"]]
+    remaining = [r for r in report if r["issues"]]
+    parts = []
+    if fixed:
+        kinds = sorted({fix for r in fixed for fix in r["fixes"]})
+        parts.append(f"Auto-fixed {len(fixed)} section{'s' if len(fixed) != 1 else ''} ({', '.join(kinds)})")
+    if repaired:
+        parts.append(f"{len(repaired)} rewritten by the editor")
+    if remaining:
+        parts.append(f"{len(remaining)} still need{'s' if len(remaining) == 1 else ''} a manual look")
+    return "; ".join(parts) + "." if parts else ""
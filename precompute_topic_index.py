@@ -0,0 +1,90 @@
+"""Offline job: fill topic_index.json with FIND-mode topic options.
+
+Runs the exact FIND-mode prompt from seven_day_pipeline.py for every
+niche x audience x goal x tone combination in the seed lists. Entries already
+in the index are skipped, so the job can be stopped and re-run at any time.
+
+Usage:
+    GEMINI_API_KEY=... python precompute_topic_index.py --workers 4
+    GEMINI_API_KEY=... python precompute_topic_index.py --seeds my_seeds.json --limit 50
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llm_calls import make_client
+from seven_day_pipeline import build_topic_prompt, fetch_topic_options
+from topic_index import INDEX_PATH, TopicIndex
+
+# Common combinations seen in workshops; the first entry of each list is the form's placeholder.
+DEFAULT_SEEDS = {
+    "niches": [
+        "Digital Marketing for Solopreneurs", "Career Coaching", "Personal Finance", "Fitness & Nutrition",
+        "Productivity", "Real Estate", "SaaS Startups", "E-commerce", "Mental Health & Wellness",
+        "Parenting", "Leadership Development", "AI Tools for Small Business",
+    ],
+    "audiences": [
+        "Women restarting careers", "First-time founders", "Freelancers", "Small business owners",
+        "College students", "Busy professionals", "Working parents", "Corporate managers",
+    ],
+    "goals": ["Build authority & trust", "Grow followers", "Generate leads"],
+    "tones": ["Empathetic, encouraging, professional"],
+}
+
+
+def load_seeds(path):
+    if not path:
+        return DEFAULT_SEEDS
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(DEFAULT_SEEDS, **json.load(f))
+
+
+def profiles(seeds):
+    for niche, audience, goal, tone in itertools.product(seeds["niches"], seeds["audiences"], seeds["goals"], seeds["tones"]):
+        yield {"niche": niche, "audience": audience, "goal": goal, "tone": tone}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seeds", help="JSON file with any of: niches, audiences, goals, tones")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many new entries (0 = all)")
+    parser.add_argument("--save-every", type=int, default=10)
+    args = parser.parse_args()
+
+    client = make_client(os.environ["GEMINI_API_KEY"])
+    index = TopicIndex.load(args.index)
+    todo = [p for p in profiles(load_seeds(args.seeds)) if p not in index]
+    if args.limit:
+        todo = todo[:args.limit]
+    print(f"{len(index)} entries in {args.index}, {len(todo)} to compute")
+
+    def compute(profile):
+        options = fetch_topic_options(client, build_topic_prompt(profile, "FIND"))
+        if not isinstance(options, list) or not options:
+            raise ValueError(f"unexpected options: {options!r}")
+        return dict(profile, options=[str(o) for o in options], created=int(time.time()))
+
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(compute, p): p for p in todo}
+        for future in as_completed(futures):
+            profile = futures[future]
+            try:
+                index.add(future.result())
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"  failed {profile['niche']} / {profile['audience']}: {e}")
+            if done and done % args.save_every == 0:
+                index.save(args.index)
+    index.save(args.index)
+    print(f"added {done}, failed {failed}, index now has {len(index)} entries")
+
+
+if __name__ == "__main__":
+    main()
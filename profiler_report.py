@@ -0,0 +1,54 @@
+"""Rerun profiler: where the server spends CPU on each app's script reruns.
+
+Shows what rerun_profiler.py has sampled in this server process and exports
+it as collapsed stacks or a speedscope file. Runs as an admin page of
+rizen_app.py (RIZEN_ADMIN_PAGES = "1"), in the same process as the apps:
+
+    RIZEN_PROFILER=1 RIZEN_ADMIN_PAGES=1 streamlit run rizen_app.py
+"""
+import streamlit as st
+
+import rerun_profiler
+
+# --- PAGE CONFIG ---
+st.set_page_config(page_title="RizenAi Profiler", page_icon="🔥", layout="wide")
+
+st.title("🔥 Rerun Profiler")
+
+if not rerun_profiler.PROFILER_ENABLED:
+    st.info("Profiling is off. Start the server with RIZEN_PROFILER = \"1\" to sample every script rerun.")
+    st.stop()
+
+st.caption(f"CPU time per rerun, sampled every {rerun_profiler.SAMPLE_INTERVAL * 1000:g} ms. "
+           "Waiting on model calls uses no CPU and does not show up here.")
+
+summary = rerun_profiler.summary()
+if not summary:
+    st.write("Nothing sampled yet. Use the tools, then come back here.")
+    st.stop()
+
+# --- RERUNS BY STAGE ---
+st.subheader("Reruns by app and stage")
+st.dataframe(summary, width="stretch", hide_index=True)
+
+# --- HOT FRAMES ---
+st.subheader("Hot frames")
+choices = ["All"] + [f"{row['app']} / {row['stage']}" for row in summary]
+choice = st.selectbox("App / stage", choices)
+app, stage = (None, None) if choice == "All" else choice.split(" / ", 1)
+st.dataframe(rerun_profiler.top_functions(app, stage), width="stretch", hide_index=True)
+
+# --- EXPORT ---
+st.subheader("Export")
+st.caption("Open either file in https://www.speedscope.app; collapsed stacks also work with flamegraph.pl.")
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.download_button("📥 Speedscope (.json)", data=lambda: rerun_profiler.speedscope(app, stage),
+                       file_name="rizenai_reruns.speedscope.json", mime="application/json", on_click="ignore")
+with col2:
+    st.download_button("📥 Collapsed stacks (.folded)", data=lambda: rerun_profiler.collapsed(app, stage),
+                       file_name="rizenai_reruns.folded", mime="text/plain", on_click="ignore")
+with col3:
+    if st.button("🗑️ Reset samples"):
+        rerun_profiler.reset()
+        st.rerun()
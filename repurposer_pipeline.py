@@ -0,0 +1,186 @@
+"""Content Repurposer pipeline stages, shared by the apps and the benchmark.
+
+Three modes produce the same deliverables with a different number of round trips:
+
+- three_stage: Captain -> Sous Chef -> Chef (the original chain)
+- two_stage:   Planner (Captain + Sous Chef in one call) -> Chef
+- fused:       one JSON-schema call, as in Cont-Rep-Mk1-V2.py
+
+The chained calls accept on_text to stream chunks to the UI as they arrive.
+"""
+import json
+
+from google.genai import types
+
+from llm_calls import generate_text
+
+MODEL = 'gemini-2.5-flash'
+
+PIPELINE_MODES = {
+    "three_stage": "Three-stage (Captain → Sous Chef → Chef)",
+    "two_stage": "Two-stage (Planner → Chef)",
+    "fused": "Fused (single call, fastest)",
+}
+
+# Checkpointed stages per mode, in order. The last call of each mode is never checkpointed.
+MODE_STAGES = {
+    "three_stage": ["order_block", "production_prompt"],
+    "two_stage": ["production_prompt"],
+    "fused": [],
+}
+
+
+# --- THREE-STAGE CHAIN ---
+
+def api_call_step1_captain(client, raw_content, user_profile, selected_platforms, on_text=None):
+    """Step 1: Analyze strategy based on SELECTED platforms."""
+    SYSTEM_INSTRUCTION = "You are the 'Captain'. Analyze the user profile, content, and TARGET PLATFORMS. Structure a strategic 'Order Block'."
+
+    # We explicitly tell the AI which platforms to focus on
+    prompt = f"""
+    User Profile: {user_profile}
+    TARGET PLATFORMS: {selected_platforms}
+    Content: {raw_content[:500]}...
+
+    Create a strategic Order Block specifically for these platforms.
+    """
+
+    return generate_text(
+        client, "captain", model=MODEL, contents=prompt,
+        config=types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION, temperature=0.3),
+        on_text=on_text,
+    )
+
+def api_call_step2_sous_chef(client, order_block, raw_content, selected_platforms, on_text=None):
+    """Step 2: Draft blueprints ONLY for the selected platforms."""
+    SYSTEM_INSTRUCTION = "You are the 'Sous Chef' (GPT-4 Mimic). Create detailed Production Instructions."
+
+    prompt = f"""
+    Order Block: {order_block}
+    Original Content: {raw_content}
+    TARGET PLATFORMS: {selected_platforms}
+
+    Create detailed writing instructions for EACH of the selected target platforms.
+    """
+
+    return generate_text(
+        client, "sous_chef", model=MODEL, contents=prompt,
+        config=types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION, temperature=0.5),
+        on_text=on_text,
+    )
+
+def api_call_step3_chef(client, production_prompt, on_text=None):
+    """Step 3: Execute the blueprints."""
+    SYSTEM_INSTRUCTION = "You are the 'Chef' (Claude Mimic). Write human-like, nuanced content deliverables based on the instructions."
+
+    return generate_text(
+        client, "chef", model=MODEL, contents=production_prompt,
+        config=types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION, temperature=0.8),
+        on_text=on_text,
+    )
+
+
+# --- TWO-STAGE CHAIN ---
+
+def api_call_planner(client, raw_content, user_profile, selected_platforms, on_text=None):
+    """Captain + Sous Chef in one call: strategy and production instructions together."""
+    SYSTEM_INSTRUCTION = (
+        "You are the 'Captain' and 'Sous Chef' in one. First structure a short strategic 'Order Block' "
+        "for the target platforms, then turn it into detailed Production Instructions."
+    )
+
+    prompt = f"""
+    User Profile: {user_profile}
+    TARGET PLATFORMS: {selected_platforms}
+    Original Content: {raw_content}
+
+    Write a brief Order Block, then detailed writing instructions for EACH of the selected target platforms.
+    """
+
+    return generate_text(
+        client, "planner", model=MODEL, contents=prompt,
+        config=types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION, temperature=0.4),
+        on_text=on_text,
+    )
+
+
+# --- FUSED SINGLE CALL ---
+
+def platform_key(platform):
+    return platform.replace(' ', '_')
+
+def create_system_instruction(data):
+    """Generates the multi-phase system instruction for the Gemini model."""
+    platforms_str = ', '.join(data['platforms'])
+
+    return f"""
+        You are the RizenAi Content Repurposing System Orchestrator.
+        User Profile: Name: {data['name']}, Profession: {data['profession']}, Objective: {data['objective']}, Tone: {data['tone']}
+        Target Platforms: {platforms_str}
+        Extra Context: {data['extra_info']}
+
+        PHASE 1 (Gemini): Analyze trends for {data['profession']}. Define Thematic Focus.
+        PHASE 2 (ChatGPT Persona): Draft production prompt based on focus.
+        PHASE 3 (Claude Persona): Write final human-like content. Avoid mechanical phrasing.
+
+        Original Content:
+        {data['original_content']}
+
+        OUTPUT FORMAT: Single valid JSON object. Keys = platform names (underscores). Values = content.
+        {{
+            "{platform_key(data['platforms'][0])}": "Content..."
+        }}
+    """
+
+def get_generation_config(platforms):
+    properties = {}
+    for platform in platforms:
+        properties[platform_key(platform)] = {"type": "string"}
+
+    # FINAL FIX: Removed the 'tools' property which conflicted with 'response_mime_type="application/json"'.
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema={"type": "object", "properties": properties}
+        # Tools removed here to resolve the 400 INVALID_ARGUMENT error.
+    )
+
+def api_call_fused(client, data, model=MODEL, on_text=None):
+    """All three phases in one schema-constrained call. Returns the raw JSON text (streamed to on_text if given)."""
+    combined_query = f"{create_system_instruction(data)}\n\nUSER QUERY: Repurpose the Original Content for the user, following the system instructions and JSON format."
+    return generate_text(client, "fused", model=model, contents=[combined_query], config=get_generation_config(data['platforms']),
+                         on_text=on_text)
+
+def fused_to_markdown(raw_json, platforms):
+    """Renders the fused JSON as the same '## Platform' markdown the chained modes produce."""
+    results = json.loads(raw_json)
+    sections = []
+    for platform in platforms:
+        content = results.get(platform_key(platform), "")
+        sections.append(f"## {platform}\n\n{content}")
+    return "\n\n".join(sections)
+
+
+# --- STRUCTURE CHECK ---
+
+def check_structure(output, platforms, mode):
+    """Checks that every selected platform got a non-empty deliverable.
+
+    Fused output must be valid JSON with a non-empty value per platform key;
+    chained output must mention each platform (or its first word, e.g. 'LinkedIn').
+    """
+    missing = []
+    if mode == "fused":
+        try:
+            results = json.loads(output)
+        except (json.JSONDecodeError, TypeError):
+            return {"valid": False, "missing": list(platforms), "error": "invalid JSON"}
+        for platform in platforms:
+            if not str(results.get(platform_key(platform), "")).strip():
+                missing.append(platform)
+    else:
+        lowered = (output or "").lower()
+        for platform in platforms:
+            first_word = platform.split()[0].split("/")[0].lower()
+            if platform.lower() not in lowered and first_word not in lowered:
+                missing.append(platform)
+    return {"valid": not missing, "missing": missing}
@@ -0,0 +1,217 @@
+"""Opt-in sampling profiler for Streamlit script reruns.
+
+Set RIZEN_PROFILER = "1" and each app's reruns are sampled: a background
+thread looks at the script thread's Python stack every SAMPLE_INTERVAL and
+charges the CPU time that thread used since the last look to the stack it
+is in now. Time spent waiting on model calls uses no CPU, so it drops out
+and what is left are the non-LLM hot spots (CSS, Lottie, markdown...).
+
+Samples are grouped by app and by the st.session_state.stage the rerun
+started in. They stay in memory in this process and can be exported as
+collapsed stacks (flamegraph.pl, speedscope) or a speedscope JSON file, for
+example from the Profiler admin page of rizen_app.py.
+
+The script's own frame is labelled with its current line, because the
+whole script body is one frame; deeper frames are labelled per function.
+Per-thread CPU time comes from /proc (Linux); elsewhere samples are
+weighted by wall time instead, which includes waits.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+PROFILER_ENABLED = os.getenv("RIZEN_PROFILER", "0") == "1"
+SAMPLE_INTERVAL = float(os.getenv("RIZEN_PROFILE_INTERVAL", "0.005"))   # seconds between samples
+
+_lock = threading.Lock()
+_active = {}      # thread ident -> the rerun being sampled on that thread
+_runs = {}        # (app, stage) -> {"runs", "wall_s", "cpu_s", "samples"}
+_stacks = {}      # (app, stage) -> {stack (root first): [samples, cpu seconds]}
+_labels = {}      # code object -> frame label
+_sampler = None
+
+# Script threads come and go (and their ids get reused), so CPU time is read by native thread id from /proc
+CPU_CLOCK = os.path.exists("/proc/self/task")
+
+
+def _thread_cpu(native_id):
+    """Seconds the thread has been on a CPU (wall time without /proc). Raises OSError once the thread is gone."""
+    if not CPU_CLOCK:
+        return time.perf_counter()
+    with open(f"/proc/self/task/{native_id}/schedstat", "rb") as f:
+        return int(f.read().split()[0]) / 1e9
+
+
+def _label(frame, root):
+    code = frame.f_code
+    if root:
+        return f"{os.path.basename(code.co_filename)}:{frame.f_lineno}"
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+# --- SAMPLING ---
+
+def profile_rerun(app, stage="main"):
+    """Starts sampling the calling script's rerun. Call at the top of the script; the run ends by itself."""
+    if not PROFILER_ENABLED:
+        return
+    ident = threading.get_ident()
+    run = {
+        "app": app, "stage": stage, "frame": sys._getframe(1), "native_id": threading.get_native_id(),
+        "started": time.perf_counter(), "stacks": {}, "samples": 0,
+    }
+    run["cpu_start"] = _thread_cpu(run["native_id"])
+    run["cpu_last"] = run["cpu_start"]
+    with _lock:
+        previous = _active.pop(ident, None)
+        if previous is not None:
+            _finish(previous)
+        _active[ident] = run
+    _ensure_sampler()
+
+
+def _ensure_sampler():
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_forever, name="rerun-profiler", daemon=True)
+            _sampler.start()
+
+
+def _sample_forever():
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        frames = sys._current_frames()
+        with _lock:
+            for ident, run in list(_active.items()):
+                _sample(ident, run, frames.get(ident))
+
+
+def _sample(ident, run, frame):
+    stack = []
+    while frame is not None and frame is not run["frame"]:
+        stack.append(frame)
+        frame = frame.f_back
+    cpu = None
+    if frame is not None:
+        try:
+            cpu = _thread_cpu(run["native_id"])
+        except OSError:
+            pass
+    if cpu is None:
+        # The script frame has returned (or the thread is gone): the rerun is over
+        del _active[ident]
+        _finish(run)
+        return
+    labels = [_label(frame, root=True)] + [_label(f, root=False) for f in reversed(stack)]
+    entry = run["stacks"].setdefault(tuple(labels), [0, 0.0])
+    entry[0] += 1
+    entry[1] += cpu - run["cpu_last"]
+    run["cpu_last"] = cpu
+    run["samples"] += 1
+
+
+def _finish(run):
+    try:
+        cpu = _thread_cpu(run["native_id"])
+    except OSError:
+        cpu = run["cpu_last"]
+    key = (run["app"], run["stage"])
+    totals = _runs.setdefault(key, {"runs": 0, "wall_s": 0.0, "cpu_s": 0.0, "samples": 0})
+    totals["runs"] += 1
+    totals["wall_s"] += time.perf_counter() - run["started"]
+    totals["cpu_s"] += cpu - run["cpu_start"]
+    totals["samples"] += run["samples"]
+    stacks = _stacks.setdefault(key, {})
+    for stack, (samples, seconds) in run["stacks"].items():
+        entry = stacks.setdefault(stack, [0, 0.0])
+        entry[0] += samples
+        entry[1] += seconds
+
+
+def reset():
+    with _lock:
+        _runs.clear()
+        _stacks.clear()
+
+
+# --- REPORTS AND EXPORT ---
+
+def summary():
+    """One row per app and stage: reruns and their average wall and CPU time."""
+    with _lock:
+        items = [(key, dict(totals)) for key, totals in _runs.items()]
+    rows = []
+    for (app, stage), totals in items:
+        runs = totals["runs"]
+        rows.append({
+            "app": app, "stage": stage, "reruns": runs,
+            "avg_wall_ms": round(totals["wall_s"] / runs * 1000, 1),
+            "avg_cpu_ms": round(totals["cpu_s"] / runs * 1000, 1),
+            "total_cpu_s": round(totals["cpu_s"], 3), "samples": totals["samples"],
+        })
+    return sorted(rows, key=lambda row: row["total_cpu_s"], reverse=True)
+
+
+def _snapshot(app=None, stage=None):
+    with _lock:
+        return {key: dict(stacks) for key, stacks in _stacks.items()
+                if (app is None or key[0] == app) and (stage is None or key[1] == stage)}
+
+
+def top_functions(app=None, stage=None, limit=25):
+    """Frames by CPU time: self (at the top of the stack) and total (anywhere on it)."""
+    own, total = {}, {}
+    for stacks in _snapshot(app, stage).values():
+        for stack, (_, seconds) in stacks.items():
+            own[stack[-1]] = own.get(stack[-1], 0.0) + seconds
+            for label in set(stack):
+                total[label] = total.get(label, 0.0) + seconds
+    rows = [{"frame": label, "self_cpu_ms": round(own.get(label, 0.0) * 1000, 1), "total_cpu_ms": round(seconds * 1000, 1)}
+            for label, seconds in total.items()]
+    return sorted(rows, key=lambda row: (row["self_cpu_ms"], row["total_cpu_ms"]), reverse=True)[:limit]
+
+
+def collapsed(app=None, stage=None, weight="cpu"):
+    """Collapsed stacks ('app;stage;frame;... value'), value in CPU microseconds or in samples."""
+    lines = []
+    for (run_app, run_stage), stacks in sorted(_snapshot(app, stage).items()):
+        for stack, (samples, seconds) in sorted(stacks.items()):
+            value = samples if weight == "samples" else round(seconds * 1_000_000)
+            if value > 0:
+                frames = [run_app, run_stage] + [label.replace(";", ",") for label in stack]
+                lines.append(f"{';'.join(frames)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def speedscope(app=None, stage=None):
+    """A speedscope file (https://www.speedscope.app) with one CPU-weighted profile per app and stage."""
+    frames, index = [], {}
+    profiles = []
+    for (run_app, run_stage), stacks in sorted(_snapshot(app, stage).items()):
+        samples, weights = [], []
+        for stack, (_, seconds) in sorted(stacks.items()):
+            if seconds <= 0:
+                continue
+            ids = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(seconds)
+        profiles.append({
+            "type": "sampled", "name": f"{run_app} {run_stage}", "unit": "seconds",
+            "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+        })
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames}, "profiles": profiles, "name": "RizenAi script reruns",
+        "exporter": "rerun_profiler",
+    })
@@ -0,0 +1,34 @@
+"""All RizenAi tools as one multipage Streamlit app.
+
+    streamlit run rizen_app.py
+
+Each tool is still a standalone script (`streamlit run Rizen_7Day_System.py`
+keeps working). st.navigation only executes the page that is open, so a
+tool's imports and setup run the first time someone visits it. From then
+on, imported modules, the Gemini client and the st.cache_* caches are shared
+by every page and session in this one process, instead of each tool paying
+for its own server.
+
+Set RIZEN_ADMIN_PAGES = "1" to add the admin pages (usage and cost report,
+rerun profiler).
+Keep it off on public deployments: the pages are not behind a login.
+"""
+import os
+
+import streamlit as st
+
+# Opt-in: admin pages show every user's usage
+ADMIN_PAGES_ENABLED = os.getenv("RIZEN_ADMIN_PAGES", "0") == "1"
+
+pages = [
+    st.Page("Rizen_7Day_System.py", title="7-Day Content System", icon="📅", url_path="seven-day", default=True),
+    st.Page("Cont_rep_Mk1_V3.py", title="Content Repurposer", icon="🚀", url_path="repurposer"),
+    st.Page("Cont-Rep-Mk1-V2.py", title="Content Repurposer (Classic)", icon="✍️", url_path="repurposer-classic"),
+]
+
+admin_pages = [
+    st.Page("usage_report.py", title="Usage & Cost", icon="📊", url_path="admin-usage"),
+    st.Page("profiler_report.py", title="Rerun Profiler", icon="🔥", url_path="admin-profiler"),
+]
+
+st.navigation({"Tools": pages, "Admin": admin_pages} if ADMIN_PAGES_ENABLED else pages).run()
@@ -0,0 +1,221 @@
+"""Near-duplicate response cache built on local hashed word vectors.
+
+"Digital marketing for solopreneurs" and "digital marketing - solopreneurs"
+miss an exact-match cache but have the same words once stop words,
+punctuation and plural 's' are dropped (topic_index.tokens). Vectors are
+computed locally (no embedding service) and matched by brute-force cosine
+similarity over a NumPy matrix.
+
+A request has two parts. The exact part (mode, tone, goal, seed, content...)
+must match exactly. The near part is a few short free-text fields (niche,
+audience), and each field must be close on its own: a hit needs every
+field's similarity at or above the stage threshold. Words, not character
+trigrams, because one changed word in a short field changes who the answer
+is for ("Men" vs "Women restarting careers" is 0.95 as trigrams, 0.67 as
+words). CALIBRATION lists the cases the default threshold is chosen for;
+`python semantic_cache.py` checks them.
+
+Only stages where a near-match answer is acceptable get a cache; see
+SEMANTIC_CACHE_STAGES. Answers are also stored under an exact key in the
+state backend, so with a shared backend other replicas get them too.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import zlib
+
+import numpy as np
+
+from singleflight import normalize_text
+from state_backend import StateBackendError, get_backend, key as state_key
+from topic_index import tokens
+
+SEMANTIC_CACHE_ENABLED = os.getenv("RIZEN_SEMANTIC_CACHE", "0") == "1"
+
+# stage -> cosine similarity every near field needs for a hit. Stages not listed are never cached.
+SEMANTIC_CACHE_STAGES = {
+    "topics": float(os.getenv("RIZEN_SEMANTIC_THRESHOLD_TOPICS", "0.9")),
+}
+
+# (field a, field b, should they share an answer) for one near field, at the default threshold.
+# At 0.9 a short field needs the same words, in any order; an added word costs a 3-word field
+# 0.87 and a 5-word one 0.91, a swapped word 0.67 or less.
+CALIBRATION = [
+    ("Digital marketing for solopreneurs", "digital marketing - solopreneurs", True),
+    ("Women restarting careers", "women restarting a career", True),
+    ("Coaches for busy moms", "busy moms coaches", True),
+    ("B2B SaaS founders and early-stage startup CEOs", "B2B SaaS founders & early stage startup CEOs", True),
+    ("Women restarting careers", "Men restarting careers", False),
+    ("Small business owners", "small business owners in India", False),
+    ("College students", "High school students", False),
+    ("Career coaching", "Career coaching for executives", False),
+    ("Fitness coaching", "Career coaching", False),
+]
+
+RESPONSE_TTL = 6 * 3600   # seconds an exact-key answer is kept in the state backend
+VECTOR_DIM = 1024
+MAX_ENTRIES = 1000   # per stage (~4 MB per near field); the oldest entry is overwritten first
+
+
+def vectorize(text, dim=VECTOR_DIM):
+    """L2-normalized hashed word vector of the text's tokens.
+
+    crc32 rather than hash() so vectors are identical across processes.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in tokens(text):
+        vector[zlib.crc32(word.encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def similarity(a, b):
+    return float(vectorize(a) @ vectorize(b))
+
+
+def _digest(text):
+    return int.from_bytes(hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class SemanticCache:
+    """Fixed-size ring of (exact key, near field vectors, value) entries.
+
+    A lookup only scores entries with the same exact key; an entry's score is
+    its lowest per-field cosine similarity, so every field has to be close.
+    """
+
+    def __init__(self, threshold, max_entries=MAX_ENTRIES, dim=VECTOR_DIM):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._dim = dim
+        self._vectors = None   # (entries, near fields, dim), allocated on the first put
+        self._exact = np.zeros(max_entries, dtype=np.int64)   # digest of each entry's exact key
+        self._values = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._hits = 0
+        self._misses = 0
+    def _query(self, near):
+        return np.stack([vectorize(text, self._dim) for text in near])
+
+    def get(self, exact, near):
+        """Returns the value of the closest entry with this exact key whose every near field clears the threshold."""
+        query = self._query(near)
+        group = _digest(exact)
+        with self._lock:
+            if self._size and self._vectors.shape[1] == len(near):
+                scores = np.einsum("efd,fd->ef", self._vectors[:self._size], query).min(axis=1)
+                scores = np.where(self._exact[:self._size] == group, scores, -1.0)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._hits += 1
+                    return self._values[best]
+            self._misses += 1
+            return None
+
+    def put(self, exact, near, value):
+        vectors = self._query(near)
+        group = _digest(exact)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self._max_entries, len(near), self._dim), dtype=np.float32)
+            self._vectors[self._next] = vectors
+            self._exact[self._next] = group
+            self._values[self._next] = value
+            self._next = (self._next + 1) % len(self._values)
+            self._size = min(self._size + 1, len(self._values))
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._size, "hits": self._hits, "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "threshold": self.threshold,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def for_stage(stage):
+    """The process-wide cache for a stage, or None if the stage must not be near-matched."""
+    if not SEMANTIC_CACHE_ENABLED or stage not in SEMANTIC_CACHE_STAGES:
+        return None
+    with _caches_lock:
+        if stage not in _caches:
+            _caches[stage] = SemanticCache(SEMANTIC_CACHE_STAGES[stage])
+        return _caches[stage]
+
+
+def _shared_key(stage, exact, near):
+    parts = [exact] + list(near or ())
+    digest = hashlib.sha256("\n".join(normalize_text(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+    return state_key("response", stage, digest)
+
+
+def _shared_get(stage, exact, near):
+    try:
+        raw = get_backend().get(_shared_key(stage, exact, near))
+    except StateBackendError:
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+def _shared_put(stage, exact, near, value):
+    try:
+        get_backend().set(_shared_key(stage, exact, near), json.dumps(value, ensure_ascii=False), ttl=RESPONSE_TTL)
+    except StateBackendError:
+        pass
+
+
+def cached_call(stage, exact, near, fn, *args, **kwargs):
+    """Returns a cached answer, or runs fn(*args, **kwargs) and caches it. Values must be JSON-serializable.
+
+    `exact` holds the request parts that must match exactly, `near` a tuple of
+    short free-text fields that may each only be close. Lookup is by both parts
+    in the state backend, then by exact key plus near-match in this process.
+    With near=None the request is only ever answered from an exact match.
+    """
+    cache = for_stage(stage)
+    if cache is None:
+        return fn(*args, **kwargs)
+    value = cache.get(exact, near) if near is not None else None
+    if value is None:
+        value = _shared_get(stage, exact, near)
+        if value is None:
+            value = fn(*args, **kwargs)
+            _shared_put(stage, exact, near, value)
+        if near is not None:
+            cache.put(exact, near, value)
+    return value
+
+
+def stats():
+    """Hit rate per enabled stage."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {stage: cache.stats() for stage, cache in caches.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the CALIBRATION pairs against a near-match threshold.")
+    parser.add_argument("--threshold", type=float, default=SEMANTIC_CACHE_STAGES["topics"])
+    args = parser.parse_args()
+    wrong = 0
+    for a, b, should_match in CALIBRATION:
+        score = similarity(a, b)
+        ok = (score >= args.threshold) == should_match
+        wrong += not ok
+        print(f"{'ok   ' if ok else 'WRONG'} {score:.3f} {'match' if should_match else 'miss ':5}  {a!r} / {b!r}")
+    print(f"{len(CALIBRATION) - wrong}/{len(CALIBRATION)} pairs judged right at threshold {args.threshold}")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
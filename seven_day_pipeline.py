@@ -0,0 +1,147 @@
+"""7-Day Content System generation steps, shared by the app and offline jobs.
+
+Nothing here touches Streamlit, so the same prompts can be run from
+precompute scripts and benchmarks.
+"""
+import json
+
+from google.genai import types
+
+import checkpoints
+from llm_calls import generate_text
+
+MODEL = 'gemini-2.5-flash'
+
+TOPIC_SYSTEM_INSTRUCTION = """
+    You are an expert Content Strategist with deep knowledge of digital trends for late 2024 and 2025.
+    Your goal is to suggest 3 highly relevant, engaging content series topics based on the user's profile.
+    
+    For each option, provide:
+    1. A Catchy Series Title
+    2. A 1-sentence 'Why this works now' justification based on current trends.
+    
+    Output MUST be a valid JSON array of strings. 
+    Example: ["Title 1 - Why it works", "Title 2 - Why it works", "Title 3 - Why it works"]
+    """
+
+# FIND mode has no user topic, so its prompt depends only on niche/audience/goal/tone.
+FIND_INPUT = "No specific topic provided. Find the best opportunity."
+
+
+# --- STEP 3: TOPIC OPTIONS ---
+
+def topic_input_context(user_input_data, mode):
+    """Determine input context based on mode."""
+    return user_input_data.get('topic_seed') if mode == "EXPAND" else FIND_INPUT
+
+def build_topic_prompt(user_input_data, mode):
+    return f"""
+    User Profile:
+    Niche: {user_input_data['niche']}
+    Audience: {user_input_data['audience']}
+    Goal: {user_input_data['goal']}
+    Tone: {user_input_data['tone']}
+    
+    Mode: {mode} (If EXPAND, build on input. If FIND, suggest new high-potential topics).
+    Input: {topic_input_context(user_input_data, mode)}
+    """
+
+def fetch_topic_options(client, prompt_context):
+    """Single Gemini call for topic options. Raises on API or JSON errors."""
+    response_text = generate_text(
+        client, "topics",
+        model=MODEL,
+        contents=prompt_context,
+        config=types.GenerateContentConfig(system_instruction=TOPIC_SYSTEM_INSTRUCTION, temperature=0.7)
+    )
+    # Clean markdown if present
+    text = response_text.replace('```json', '').replace('```', '').strip()
+    return json.loads(text)
+
+
+# --- STEP 4: THE 7-DAY PLAN ---
+
+def plan_checkpoint_key(selected_topic, user_data):
+    return checkpoints.submission_key(selected_topic, user_data)
+
+def generate_7_day_plan(client, selected_topic, user_data):
+    """
+    Step 4 Logic: The Heavy Lifting.
+    1. Strategy (ChatGPT Mimic)
+    2. Writing (Claude Mimic)
+    Returns the full text content.
+    """
+    
+    platforms_list = ", ".join(user_data['platforms'])
+
+    # PHASE 1: STRATEGY (ChatGPT Persona - Logic & Structure)
+    strat_system = """
+    You are a Master Content Planner (modeled after GPT-4's reasoning).
+    Create a detailed 7-day outline for this topic. 
+    Focus on narrative flow, engagement hooks, and high value.
+    Do NOT write the posts yet. Just the plan.
+    """
+    
+    strat_prompt = f"""
+    Plan a 7-Day Content Series.
+    Topic: {selected_topic}
+    Audience: {user_data['audience']}
+    Platforms: {platforms_list}
+    Goal: {user_data['goal']}
+    """
+    
+    # Resume from a saved strategy if an earlier attempt got past Phase 1
+    run_key = plan_checkpoint_key(selected_topic, user_data)
+    saved = checkpoints.load(run_key)
+    if 'strategy' in saved:
+        strategy = saved['strategy']
+    else:
+        strategy = generate_text(
+            client, "strategy",
+            model=MODEL,
+            contents=strat_prompt,
+            config=types.GenerateContentConfig(system_instruction=strat_system, temperature=0.4)
+        )
+        checkpoints.save(run_key, 'strategy', strategy)
+    
+    # PHASE 2: WRITING (Claude Persona - Human & Nuanced)
+    write_system = """
+    You are a world-class Creative Writer (modeled after Claude 3 Opus).
+    Write the full content for the 7-Day Series based on the strategy provided.
+    
+    RULES:
+    1. No AI cliches ('Unlock', 'Unleash', 'In today's world', 'Deep dive').
+    2. Write in a human, engaging voice matching the user's tone.
+    3. For EACH DAY, write specific content for EACH selected platform.
+       - Label them clearly (e.g., [LinkedIn], [Twitter]).
+       - Include specific CTAs and Hashtags for each.
+    4. Add a small 'How-To Guide' at the very start of the file.
+    5. Include 'Game Mode' nudges (fun challenges) for each day.
+    
+    FORMAT:
+    The output must be a single text stream.
+    Use the exact delimiter '--- DAY [Number] ---' to separate days.
+    Example:
+    --- DAY 1 ---
+    (Content for Day 1)
+    --- DAY 2 ---
+    (Content for Day 2)
+    """
+    
+    write_prompt = f"""
+    Execute this Plan and write the full content.
+    User Tone: {user_data['tone']}
+    Target Platforms: {platforms_list}
+    
+    STRATEGY BLUEPRINT:
+    {strategy}
+    """
+    
+    final_text = generate_text(
+        client, "writing",
+        model=MODEL,
+        contents=write_prompt,
+        config=types.GenerateContentConfig(system_instruction=write_system, temperature=0.8)
+    )
+    checkpoints.clear(run_key)
+    return final_text
@@ -0,0 +1,96 @@
+"""Resources shared by every RizenAi page and session in one server process.
+
+Each app used to build its own Gemini client on every rerun and keep its own
+copy of the Lottie loader cache. Through these helpers they share one client
+per API key (and with it one HTTP connection pool) and one asset cache,
+whether they run on their own or as pages of rizen_app.py.
+
+Page styles are static files too: use_stylesheet() emits a one-line import
+of the content-hashed stylesheet built by build_static_assets.py, so reruns
+no longer re-send kilobytes of CSS and the browser fetches it once.
+
+bind_usage() tells the usage ledger who this script run is calling for, and
+start_usage_flow()/complete_usage_flow() bracket one run of a tool, so the
+ledger can report cost per finished result.
+"""
+import json
+import os
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import usage_ledger
+from llm_calls import make_client
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+STYLE_DIR = os.path.join(ASSET_DIR, "styles")
+CSS_MANIFEST = os.path.join(ASSET_DIR, "static", "css", "manifest.json")
+
+# Opt-in: set RIZEN_USAGE_KEY_BY_IP = "1" to count anonymous users by client IP instead of by session.
+# Everyone behind one proxy or NAT then shares a user budget, so only use it when IPs are per person.
+USAGE_KEY_BY_IP = os.getenv("RIZEN_USAGE_KEY_BY_IP", "0") == "1"
+
+
+@st.cache_resource(show_spinner=False)
+def get_client(api_key):
+    return make_client(api_key)
+
+
+@st.cache_data(show_spinner=False)
+def load_lottiefile(filepath: str):
+    """Lottie JSON by file name; relative paths resolve against the repo, not the working directory."""
+    try:
+        with open(os.path.join(ASSET_DIR, filepath), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_data(show_spinner=False)
+def _stylesheet_tag(name, manifest_mtime, static_serving):
+    # manifest_mtime is only part of the cache key, so a rebuild is picked up without a restart
+    if static_serving and manifest_mtime:
+        with open(CSS_MANIFEST, "r", encoding="utf-8") as f:
+            built = json.load(f).get(name)
+        if built:
+            return f"<style>@import url('app/static/css/{built}');</style>"
+    # Static serving off or assets not built: fall back to inlining the source stylesheet
+    with open(os.path.join(STYLE_DIR, f"{name}.css"), "r", encoding="utf-8") as f:
+        return f"<style>{f.read()}</style>"
+
+
+def use_stylesheet(name):
+    """Applies styles/<name>.css to the page."""
+    mtime = os.path.getmtime(CSS_MANIFEST) if os.path.exists(CSS_MANIFEST) else 0
+    st.markdown(_stylesheet_tag(name, mtime, st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
+
+
+# --- USAGE LEDGER ---
+
+def _usage_user_id(session_id):
+    # Signed-in email when st.login is configured, else the browser session (or the client IP, if opted in)
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return st.user["email"]
+    if USAGE_KEY_BY_IP and st.context.ip_address:
+        return f"ip:{st.context.ip_address}"
+    return f"session:{session_id}"
+
+
+def _flow_key(app):
+    # One open flow per app: under rizen_app.py all pages share one st.session_state
+    return f"usage_flow_id:{app}"
+
+
+def bind_usage(app):
+    """Tags this script run's model calls with the user, session, app and the app's open flow."""
+    ctx = get_script_run_ctx()
+    session_id = ctx.session_id if ctx is not None else None
+    usage_ledger.bind(_usage_user_id(session_id), session_id, app, st.session_state.get(_flow_key(app)))
+
+
+def start_usage_flow(app):
+    st.session_state[_flow_key(app)] = usage_ledger.start_flow(app)
+
+
+def complete_usage_flow(app):
+    usage_ledger.complete_flow(st.session_state.pop(_flow_key(app), None))
@@ -0,0 +1,69 @@
+"""Single-flight coalescing of identical in-flight calls.
+
+When several sessions ask for the same thing at the same time, only the first
+caller (the leader) runs the function; the rest wait for it and share the
+result. Nothing is cached once the call finishes.
+"""
+import re
+import threading
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text):
+    """Lowercases and collapses punctuation/whitespace: 'Digital  Marketing!' -> 'digital marketing'."""
+    return _NON_WORD.sub(" ", str(text or "").lower()).strip()
+
+
+def request_key(*parts):
+    """Builds a coalescing key from normalized request parts."""
+    return "|".join(normalize_text(part) for part in parts)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {"requests": 0, "calls_made": 0, "calls_saved": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) once per key at a time; followers share the outcome."""
+        with self._lock:
+            self._stats["requests"] += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self._stats["calls_made"] += 1
+            else:
+                self._stats["calls_saved"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._in_flight))
@@ -0,0 +1,218 @@
+"""Pluggable key-value backend for state that replicas should share.
+
+Response caches, pipeline checkpoints, the hedge budget and the token
+budgets read and write through get_backend(). The default MemoryBackend
+keeps everything in this process, which is what a single replica needs.
+Set RIZEN_STATE_BACKEND to a redis:// URL and every replica shares one
+store, so a cache filled by one replica is warm for the others and quotas
+are counted once.
+
+RedisBackend speaks the Redis protocol (RESP) directly over a socket, so it
+works with Redis, Valkey, KeyDB or fake_redis_server.py without a client
+library. Values are strings.
+"""
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+# "" or "memory" for process-local state, or e.g. redis://:password@cache-host:6379/0
+STATE_BACKEND_URL = os.getenv("RIZEN_STATE_BACKEND", "")
+KEY_PREFIX = "rizen:"
+REDIS_TIMEOUT = 2.0   # seconds per command before the backend counts as unavailable
+REDIS_POOL_SIZE = 8
+
+
+class StateBackendError(ConnectionError):
+    """The backend could not be reached or rejected a command. Callers degrade (cache miss, no hedge)."""
+
+
+class MemoryBackend:
+    """Process-local store with per-key expiry."""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}   # key -> (value, expires_at or None)
+        self._writes = 0
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (str(value), now + ttl if ttl else None)
+            self._writes += 1
+            if self._writes % 256 == 0:
+                for stale in [k for k, (_, expires) in self._data.items() if expires is not None and expires <= now]:
+                    del self._data[stale]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, ttl=None, amount=1):
+        """Adds amount to a counter and returns it. ttl is set when the counter is created."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                self._data[key] = (str(amount), now + ttl if ttl else None)
+                return amount
+            count = int(entry[0]) + amount
+            self._data[key] = (str(count), entry[1])
+            return count
+
+    def ping(self):
+        return True
+
+
+class RedisBackend:
+    """Minimal RESP client with a small connection pool."""
+
+    shared = True
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._pool = []
+        self._pool_lock = threading.Lock()
+
+    # --- connection handling ---
+
+    def _connect(self):
+        """New connection, authenticated and on the right db. Any failure is a StateBackendError."""
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=REDIS_TIMEOUT)
+        except OSError as e:
+            raise StateBackendError(f"cannot reach {self.host}:{self.port}: {e}") from e
+        conn = (sock, sock.makefile("rb"))
+        try:
+            if self.password:
+                self._roundtrip(conn, ("AUTH", self.password))
+            if self.db:
+                self._roundtrip(conn, ("SELECT", self.db))
+        except (OSError, ValueError) as e:   # timeouts, resets and refused AUTH/SELECT (StateBackendError)
+            sock.close()
+            raise StateBackendError(f"handshake with {self.host}:{self.port} failed: {e}") from e
+        return conn
+
+    def _roundtrip(self, conn, args):
+        sock, reader = conn
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        sock.sendall(b"".join(parts))
+        return self._read_reply(reader)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise StateBackendError("connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise StateBackendError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            return reader.read(length + 2)[:-2].decode("utf-8")
+        if kind == b"*":
+            count = int(payload)
+            return None if count == -1 else [self._read_reply(reader) for _ in range(count)]
+        raise StateBackendError(f"unexpected reply {line!r}")
+
+    def command(self, *args):
+        """Runs one command on a pooled connection; a broken connection is dropped, not reused."""
+        with self._pool_lock:
+            conn = self._pool.pop() if self._pool else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            reply = self._roundtrip(conn, args)
+        except (OSError, ValueError) as e:
+            conn[0].close()
+            raise StateBackendError(str(e)) from e
+        except StateBackendError:
+            conn[0].close()
+            raise
+        with self._pool_lock:
+            if len(self._pool) < REDIS_POOL_SIZE:
+                self._pool.append(conn)
+                conn = None
+        if conn is not None:
+            conn[0].close()
+        return reply
+
+    # --- backend interface ---
+
+    def get(self, key):
+        return self.command("GET", key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.command("SET", key, value, "EX", max(1, int(ttl)))
+        else:
+            self.command("SET", key, value)
+
+    def delete(self, key):
+        self.command("DEL", key)
+
+    def incr(self, key, ttl=None, amount=1):
+        count = self.command("INCRBY", key, amount)
+        if count == amount and ttl:
+            self.command("EXPIRE", key, max(1, int(ttl)))
+        return count
+
+    def ping(self):
+        return self.command("PING") == "PONG"
+
+
+# --- PROCESS-WIDE BACKEND ---
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(url):
+    if not url or url == "memory":
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://")):
+        if url.startswith("rediss://"):
+            raise ValueError("TLS (rediss://) is not supported; use a local TLS tunnel or redis://")
+        return RedisBackend(url)
+    raise ValueError(f"unknown RIZEN_STATE_BACKEND {url!r}")
+
+
+def get_backend():
+    """The backend every module in this process shares."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(STATE_BACKEND_URL)
+        return _backend
+
+
+def key(*parts):
+    """Namespaced key, e.g. key("checkpoint", digest) -> "rizen:checkpoint:<digest>"."""
+    return KEY_PREFIX + ":".join(str(part) for part in parts)
@@ -0,0 +1,48 @@
+"""Live markdown view for streamed model output.
+
+Re-rendering the whole buffer on every token makes each update cost O(length
+so far). LiveMarkdown batches chunks and redraws at most once per interval,
+and freezes finished paragraphs into their own elements so only the
+paragraph still being written is re-sent.
+"""
+import time
+
+import streamlit as st
+
+STREAM_RENDER_INTERVAL = 0.25  # seconds between redraws
+CURSOR = " ▌"
+
+
+class LiveMarkdown:
+    """Callable sink for on_text: view = LiveMarkdown(); call(..., on_text=view); view.finish()."""
+
+    def __init__(self, container=None, interval=STREAM_RENDER_INTERVAL):
+        self._container = container if container is not None else st.container()
+        self._tail = self._container.empty()
+        self._interval = interval
+        self._buffer = ""
+        self._last_render = 0.0
+        self._received = False
+
+    def __call__(self, chunk):
+        self._received = True
+        self._buffer += chunk
+        now = time.monotonic()
+        if now - self._last_render >= self._interval:
+            self._render(cursor=True)
+            self._last_render = now
+
+    def _render(self, cursor):
+        # Freeze completed paragraphs, unless the cut would land inside a code fence.
+        cut = self._buffer.rfind("\n\n")
+        if cut > 0 and self._buffer[:cut].count("```") % 2 == 0:
+            self._tail.markdown(self._buffer[:cut])
+            self._tail = self._container.empty()
+            self._buffer = self._buffer[cut + 2:]
+        self._tail.markdown(self._buffer + (CURSOR if cursor else ""))
+
+    def finish(self, full_text=None):
+        """Final redraw without the cursor. full_text covers answers that never streamed (e.g. cache hits)."""
+        if not self._received and full_text:
+            self._buffer = full_text
+        self._render(cursor=False)
@@ -0,0 +1,115 @@
+"""Precomputed topic options for "Find Topic for Me" (FIND) mode.
+
+FIND-mode prompts depend only on niche/audience/goal/tone, so an offline job
+(precompute_topic_index.py) fills a JSON index for common combinations. At
+runtime a fuzzy token match answers in milliseconds; anything without a close
+match falls back to the live Gemini call.
+"""
+import json
+import os
+import threading
+
+from singleflight import normalize_text
+
+INDEX_PATH = os.getenv("RIZEN_TOPIC_INDEX", "topic_index.json")
+MATCH_THRESHOLD = float(os.getenv("RIZEN_TOPIC_INDEX_THRESHOLD", "0.6"))
+
+# Niche and audience decide the topics; goal and tone only nudge them.
+FIELD_WEIGHTS = {"niche": 0.4, "audience": 0.4, "goal": 0.15, "tone": 0.05}
+# Each of these must match at least this well on its own before the weighted score counts,
+# so a matching niche (plus goal and tone) can never carry a different audience, or the reverse.
+FIELD_MINIMUMS = {"niche": 0.5, "audience": 0.5}
+
+STOP_WORDS = {"a", "an", "and", "the", "for", "of", "to", "in", "on", "with", "who", "my", "i", "me", "e", "g"}
+
+
+def tokens(text):
+    """Normalized token set: lowercase, no punctuation or stop words, plural 's' dropped."""
+    words = normalize_text(text).split()
+    return frozenset(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words if w not in STOP_WORDS)
+
+
+def _jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def profile_key(profile):
+    """Exact key used to de-duplicate entries in the index."""
+    return "|".join(" ".join(sorted(tokens(profile.get(field, "")))) for field in FIELD_WEIGHTS)
+
+
+class TopicIndex:
+    """In-memory index over precomputed entries with an inverted token index for candidates."""
+
+    def __init__(self, entries=()):
+        self._lock = threading.Lock()
+        self.entries = []
+        self._keys = set()
+        self._token_sets = []
+        self._postings = {}   # niche/audience token -> entry ids
+        self.stats = {"lookups": 0, "hits": 0}
+        for entry in entries:
+            self.add(entry)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Reads the index file; a missing or unreadable file gives an empty index."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f).get("entries", []))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+
+    def save(self, path=INDEX_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def __contains__(self, profile):
+        return profile_key(profile) in self._keys
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry):
+        """Adds {'niche', 'audience', 'goal', 'tone', 'options'}; duplicates are ignored."""
+        key = profile_key(entry)
+        with self._lock:
+            if key in self._keys:
+                return
+            entry_id = len(self.entries)
+            self.entries.append(entry)
+            self._keys.add(key)
+            token_sets = {field: tokens(entry.get(field, "")) for field in FIELD_WEIGHTS}
+            self._token_sets.append(token_sets)
+            for token in token_sets["niche"] | token_sets["audience"]:
+                self._postings.setdefault(token, set()).add(entry_id)
+
+    def lookup(self, profile, threshold=MATCH_THRESHOLD):
+        """Returns (options, score) for the closest entry scoring >= threshold, else None.
+
+        Entries whose niche or audience alone falls below FIELD_MINIMUMS are never candidates.
+        """
+        query = {field: tokens(profile.get(field, "")) for field in FIELD_WEIGHTS}
+        candidates = set()
+        for token in query["niche"] | query["audience"]:
+            candidates |= self._postings.get(token, set())
+
+        best_id, best_score = None, 0.0
+        for entry_id in candidates:
+            entry_tokens = self._token_sets[entry_id]
+            if any(_jaccard(query[field], entry_tokens[field]) < minimum for field, minimum in FIELD_MINIMUMS.items()):
+                continue
+            score = sum(weight * _jaccard(query[field], entry_tokens[field]) for field, weight in FIELD_WEIGHTS.items())
+            if score > best_score:
+                best_id, best_score = entry_id, score
+
+        with self._lock:
+            self.stats["lookups"] += 1
+            if best_id is None or best_score < threshold:
+                return None
+            self.stats["hits"] += 1
+        return list(self.entries[best_id]["options"]), round(best_score, 3)
@@ -0,0 +1,276 @@
+"""Token and cost ledger with per-user and global budgets.
+
+Every model call is written to a local SQLite file with its stage, model,
+prompt/output/thinking tokens, estimated cost, and who made it: the user,
+the Streamlit session and the flow (one run of a tool from submit to
+result). The file is the report store; budgets do not read it.
+
+Budgets are counted per UTC day in the state backend (state_backend.py):
+one counter per user and one for everyone, each a single INCRBY with a TTL.
+With a shared backend every replica counts against the same budget. Before
+a call goes out, today's counters are checked against the per-user and
+global budgets.
+
+The apps bind the caller once per script run (shared_resources.bind_usage),
+so llm_calls can record and enforce without every call site passing ids.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from state_backend import StateBackendError, get_backend, key as state_key
+
+# On by default; set RIZEN_LEDGER = "0" to stop writing the SQLite file (budgets still apply).
+LEDGER_ENABLED = os.getenv("RIZEN_LEDGER", "1") == "1"
+LEDGER_PATH = os.getenv("RIZEN_LEDGER_PATH", os.path.join(".rizen_cache", "usage.sqlite3"))
+
+# Tokens (prompt + output + thinking) allowed per UTC day; 0 means no limit.
+USER_DAILY_TOKENS = int(os.getenv("RIZEN_USER_DAILY_TOKENS", "0"))
+GLOBAL_DAILY_TOKENS = int(os.getenv("RIZEN_GLOBAL_DAILY_TOKENS", "0"))
+BUDGETS_ENABLED = bool(USER_DAILY_TOKENS or GLOBAL_DAILY_TOKENS)
+BUDGET_DAY = 24 * 3600
+COUNTER_TTL = 2 * BUDGET_DAY   # a day's counters outlive the day, then expire
+
+# USD per million tokens (input, output). Thinking tokens are billed as output.
+MODEL_PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-preview-09-2025": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+DEFAULT_PRICE = (0.30, 2.50)
+
+SYSTEM_USER = "system"   # offline jobs and benchmarks
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT,
+    flow_id TEXT,
+    app TEXT,
+    stage TEXT NOT NULL,
+    model TEXT,
+    prompt_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    thinking_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_user_ts ON calls (user_id, ts);
+CREATE INDEX IF NOT EXISTS calls_ts ON calls (ts);
+CREATE INDEX IF NOT EXISTS calls_flow ON calls (flow_id);
+CREATE TABLE IF NOT EXISTS flows (
+    flow_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    session_id TEXT,
+    app TEXT,
+    started REAL NOT NULL,
+    completed REAL
+);
+"""
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised before a call that would go over a token budget."""
+
+
+# --- STORAGE ---
+
+def _connection():
+    """One connection per thread (sqlite3 connections are not shareable across threads)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != LEDGER_PATH:
+        directory = os.path.dirname(LEDGER_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(LEDGER_PATH, timeout=5)
+        with _init_lock:
+            if LEDGER_PATH not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _initialized.add(LEDGER_PATH)
+        _local.conn, _local.path = conn, LEDGER_PATH
+    return conn
+
+
+# --- CALLER CONTEXT ---
+
+def bind(user_id, session_id=None, app=None, flow_id=None):
+    """Sets who is calling for the rest of this thread's work (one Streamlit script run)."""
+    _local.context = {"user_id": user_id, "session_id": session_id, "app": app, "flow_id": flow_id}
+
+
+def current():
+    return getattr(_local, "context", None) or {"user_id": SYSTEM_USER, "session_id": None, "app": None, "flow_id": None}
+
+
+@contextmanager
+def bound(user_id, session_id=None, app=None, flow_id=None):
+    previous = getattr(_local, "context", None)
+    bind(user_id, session_id, app, flow_id)
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+# --- FLOWS ---
+
+def start_flow(app=None):
+    """Opens a flow for the bound caller and tags their following calls with it. Returns its id."""
+    context = current()
+    flow_id = uuid.uuid4().hex[:16]
+    context["flow_id"] = flow_id
+    _local.context = context
+    if LEDGER_ENABLED:
+        try:
+            conn = _connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO flows (flow_id, user_id, session_id, app, started) VALUES (?, ?, ?, ?, ?)",
+                    (flow_id, context["user_id"], context["session_id"], app or context["app"], time.time()),
+                )
+        except (sqlite3.Error, OSError):
+            pass  # an unwritable or locked ledger must not block a submit; the flow just goes unreported
+    return flow_id
+
+
+def complete_flow(flow_id):
+    if LEDGER_ENABLED and flow_id:
+        try:
+            conn = _connection()
+            with conn:
+                conn.execute("UPDATE flows SET completed = ? WHERE flow_id = ? AND completed IS NULL", (time.time(), flow_id))
+        except (sqlite3.Error, OSError):
+            pass
+
+
+# --- RECORDING AND BUDGETS ---
+
+def cost_usd(model, prompt_tokens, output_tokens, thinking_tokens):
+    if model.startswith("local/"):
+        return 0.0   # self-hosted (llm_backends.OpenAICompatBackend): no per-token price
+    input_price, output_price = MODEL_PRICES.get(model, DEFAULT_PRICE)
+    return (prompt_tokens * input_price + (output_tokens + thinking_tokens) * output_price) / 1_000_000
+
+
+def record(stage, model, prompt_tokens, output_tokens, thinking_tokens):
+    context = current()
+    _count_tokens(context["user_id"], prompt_tokens + output_tokens + thinking_tokens)
+    if not LEDGER_ENABLED:
+        return
+    try:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO calls (ts, user_id, session_id, flow_id, app, stage, model, prompt_tokens, output_tokens,"
+                " thinking_tokens, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), context["user_id"], context["session_id"], context["flow_id"], context["app"], stage, model,
+                 prompt_tokens, output_tokens, thinking_tokens,
+                 cost_usd(model, prompt_tokens, output_tokens, thinking_tokens)),
+            )
+    except (sqlite3.Error, OSError):
+        pass  # a lost ledger row must not fail a call that has already been paid for
+
+
+def _counter(day, user_id=None):
+    if user_id is None:
+        return state_key("tokens", day, "all")
+    return state_key("tokens", day, "user", user_id)
+
+
+def _today():
+    return int(time.time() // BUDGET_DAY)
+
+
+def _count_tokens(user_id, tokens):
+    """Adds a call's tokens to today's counters for the user and for everyone."""
+    if not BUDGETS_ENABLED or tokens <= 0:
+        return
+    day = _today()
+    try:
+        backend = get_backend()
+        backend.incr(_counter(day), ttl=COUNTER_TTL, amount=tokens)
+        if user_id != SYSTEM_USER:
+            backend.incr(_counter(day, user_id), ttl=COUNTER_TTL, amount=tokens)
+    except StateBackendError:
+        pass  # the call is already made; a missed count only makes the budget more lenient
+
+
+def tokens_used(user_id=None):
+    """Tokens used so far this UTC day, by one user or everyone. None if the state backend is down."""
+    try:
+        value = get_backend().get(_counter(_today(), user_id))
+    except StateBackendError:
+        return None
+    return int(value or 0)
+
+
+def check_budget():
+    """Raises BudgetExceeded if the bound user, or everyone together, has used up today's budget.
+
+    If the state backend cannot be reached, calls are let through.
+    """
+    if not BUDGETS_ENABLED:
+        return
+    user_id = current()["user_id"]
+    if USER_DAILY_TOKENS and user_id != SYSTEM_USER and (tokens_used(user_id) or 0) >= USER_DAILY_TOKENS:
+        raise BudgetExceeded("You have reached your daily usage limit. Please try again tomorrow.")
+    if GLOBAL_DAILY_TOKENS and (tokens_used() or 0) >= GLOBAL_DAILY_TOKENS:
+        raise BudgetExceeded("RizenAi has reached its daily usage limit. Please try again later.")
+
+
+# --- REPORTS ---
+
+def top_users(window, limit=20):
+    return _rows(
+        "SELECT user_id, COUNT(*) AS calls, SUM(prompt_tokens) AS prompt_tokens, SUM(output_tokens) AS output_tokens,"
+        " SUM(thinking_tokens) AS thinking_tokens, ROUND(SUM(cost_usd), 4) AS cost_usd"
+        " FROM calls WHERE ts >= ? GROUP BY user_id ORDER BY SUM(cost_usd) DESC LIMIT ?",
+        (time.time() - window, limit),
+    )
+
+
+def by_stage(window):
+    return _rows(
+        "SELECT app, stage, COUNT(*) AS calls, ROUND(AVG(prompt_tokens)) AS avg_prompt,"
+        " ROUND(AVG(output_tokens + thinking_tokens)) AS avg_output, ROUND(SUM(cost_usd), 4) AS cost_usd"
+        " FROM calls WHERE ts >= ? GROUP BY app, stage ORDER BY SUM(cost_usd) DESC",
+        (time.time() - window,),
+    )
+
+
+def flow_costs(window):
+    """Cost and tokens per completed flow, averaged per app."""
+    return _rows(
+        "SELECT f.app, COUNT(*) AS completed_flows, ROUND(AVG(t.cost), 5) AS avg_cost_usd,"
+        " ROUND(MAX(t.cost), 5) AS max_cost_usd, ROUND(AVG(t.tokens)) AS avg_tokens, ROUND(AVG(t.calls), 1) AS avg_calls,"
+        " ROUND(AVG(f.completed - f.started), 1) AS avg_seconds"
+        " FROM flows f JOIN (SELECT flow_id, SUM(cost_usd) AS cost, SUM(prompt_tokens + output_tokens + thinking_tokens)"
+        " AS tokens, COUNT(*) AS calls FROM calls GROUP BY flow_id) t ON t.flow_id = f.flow_id"
+        " WHERE f.completed IS NOT NULL AND f.started >= ? GROUP BY f.app ORDER BY avg_cost_usd DESC",
+        (time.time() - window,),
+    )
+
+
+def totals(window):
+    rows = _rows(
+        "SELECT COUNT(*) AS calls, COUNT(DISTINCT user_id) AS users,"
+        " COALESCE(SUM(prompt_tokens + output_tokens + thinking_tokens), 0) AS tokens,"
+        " ROUND(COALESCE(SUM(cost_usd), 0), 4) AS cost_usd FROM calls WHERE ts >= ?",
+        (time.time() - window,),
+    )
+    return rows[0]
+
+
+def _rows(query, params):
+    cursor = _connection().execute(query, params)
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
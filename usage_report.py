@@ -0,0 +1,55 @@
+"""Usage report: who is spending tokens, on what, and what one finished result costs.
+
+Reads the ledger written by usage_ledger.py. Runs as an admin page of
+rizen_app.py (RIZEN_ADMIN_PAGES = "1") or on its own:
+
+    streamlit run usage_report.py
+"""
+import streamlit as st
+
+import usage_ledger
+
+# --- PAGE CONFIG ---
+st.set_page_config(page_title="RizenAi Usage", page_icon="📊", layout="wide")
+
+WINDOWS = {"Last hour": 3600, "Last 24 hours": 24 * 3600, "Last 7 days": 7 * 24 * 3600, "Last 30 days": 30 * 24 * 3600}
+
+st.title("📊 Usage & Cost")
+
+if not usage_ledger.LEDGER_ENABLED:
+    st.warning("The usage ledger is switched off (RIZEN_LEDGER = \"0\"), so nothing new is being recorded.")
+
+window_label = st.selectbox("Window", list(WINDOWS), index=1)
+window = WINDOWS[window_label]
+
+# --- TOTALS ---
+totals = usage_ledger.totals(window)
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Calls", f"{totals['calls']:,}")
+col2.metric("Users", f"{totals['users']:,}")
+col3.metric("Tokens", f"{totals['tokens']:,}")
+col4.metric("Est. cost (USD)", f"${totals['cost_usd']:,.2f}")
+
+budgets = []
+if usage_ledger.USER_DAILY_TOKENS:
+    budgets.append(f"{usage_ledger.USER_DAILY_TOKENS:,} tokens per user")
+if usage_ledger.GLOBAL_DAILY_TOKENS:
+    used = usage_ledger.tokens_used()
+    budgets.append(f"{usage_ledger.GLOBAL_DAILY_TOKENS:,} tokens overall "
+                   + (f"({used:,} used today)" if used is not None else "(state backend unreachable)"))
+st.caption("Daily budgets (per UTC day): " + ("; ".join(budgets) if budgets else "none set"))
+
+# --- TOP CONSUMERS ---
+st.subheader("Top consumers")
+st.dataframe(usage_ledger.top_users(window), width="stretch", hide_index=True)
+
+# --- COST PER COMPLETED FLOW ---
+st.subheader("Cost per completed flow")
+st.caption("One flow is one run of a tool from submit to finished result, including retries and polish calls.")
+st.dataframe(usage_ledger.flow_costs(window), width="stretch", hide_index=True)
+
+# --- BY STAGE ---
+st.subheader("By stage")
+st.dataframe(usage_ledger.by_stage(window), width="stretch", hide_index=True)
+
+st.caption("Costs are estimates from list prices in usage_ledger.MODEL_PRICES.")